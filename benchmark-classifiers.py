@@ -0,0 +1,85 @@
+"""Compare classifier backends of the processor on a labelled sample.
+
+Sample is a JSON lines file, one article per line: `{"title": "...", "content": "...", "label": "politics"}`,
+labels are from debias.processor.nlp.config.NEWS_CATEGORIES. ONNX model is expected to be exported
+by download-models.py. Model names and paths are read from the processor configuration.
+
+SAMPLE=./sample.jsonl PROCESSOR_CONFIG=debias/processor/config.toml uv run --group processor benchmark-classifiers.py
+"""
+
+import json
+import logging
+import os
+import time
+import tomllib
+
+from debias.processor.nlp.classifier import EmbeddingClassifier, OnnxZeroShotClassifier, ZeroShotClassifier
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "8"))
+
+
+def load_sample(path: str) -> tuple[list[tuple[str, str]], list[str]]:
+    articles, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                articles.append((item["title"], item.get("content", "")))
+                labels.append(item["label"])
+    return articles, labels
+
+
+def run(classifier, articles: list[tuple[str, str]]) -> tuple[list[str], float]:
+    predicted = []
+    start = time.perf_counter()
+    for offset in range(0, len(articles), BATCH_SIZE):
+        predicted.extend(classifier.classify_batch(articles[offset : offset + BATCH_SIZE]))
+    return predicted, time.perf_counter() - start
+
+
+def accuracy(predicted: list[str], expected: list[str]) -> float:
+    return sum(p == e for p, e in zip(predicted, expected, strict=True)) / len(expected)
+
+
+def main():
+    with open(os.environ.get("PROCESSOR_CONFIG", "debias/processor/config.toml"), "rb") as f:
+        config = tomllib.load(f)
+
+    articles, labels = load_sample(os.environ["SAMPLE"])
+    if not articles:
+        logger.error("sample is empty")
+        return
+    logger.info(f"loaded {len(articles)} labelled articles")
+
+    backends = {
+        "torch fp32": lambda: ZeroShotClassifier(config.get("transformers_model", "facebook/bart-large-mnli")),
+        "onnx int8": lambda: OnnxZeroShotClassifier(config.get("onnx_model", "models/bart-large-mnli-int8")),
+        "embedding": lambda: EmbeddingClassifier(
+            config.get("embedding_model", "sentence-transformers/all-MiniLM-L6-v2"),
+            config.get("label_cache", "models/labels"),
+        ),
+    }
+
+    baseline: tuple[list[str], float] | None = None
+    for name, load in backends.items():
+        classifier = load()
+        run(classifier, articles[:BATCH_SIZE])  # warm up
+        predicted, elapsed = run(classifier, articles)
+        logger.info(
+            f"{name:>10}: {len(articles) / elapsed:6.1f} articles/s, {elapsed / len(articles) * 1000:7.1f} ms/article, "
+            f"accuracy {accuracy(predicted, labels):.1%}"
+        )
+        if baseline is None:
+            baseline = (predicted, elapsed)
+        else:
+            logger.info(
+                f"{'':>10}  {baseline[1] / elapsed:.1f}x faster than baseline, "
+                f"same label on {accuracy(predicted, baseline[0]):.1%} articles"
+            )
+
+
+if __name__ == "__main__":
+    main()
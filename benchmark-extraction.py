@@ -0,0 +1,96 @@
+"""Regression and speed check of article extraction: BeautifulSoup parse_news against the single-pass lxml scan.
+
+Pages are expected in the same layout as in the S3 bucket, e.g. after `mc mirror s3/bucket ./pages`:
+compressed `{target_id}/{content_hash}.html.zst` with dictionaries in `{target_id}/dictionaries/`,
+or `{target_id}/{url_hash}/{content_hash}.html` stored before compression.
+Results are reported per target, mismatching fields are logged with SHOW_DIFF=1.
+
+PAGES_DIR=./pages uv run --group processor benchmark-extraction.py
+"""
+
+import logging
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import zstandard
+
+from debias.processor.nlp.parser import parse_news
+from debias.processor.nlp.scan import scan_page
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+REPEATS = int(os.environ.get("REPEATS", "3"))
+SHOW_DIFF = os.environ.get("SHOW_DIFF") == "1"
+FIELDS = ("title", "date", "content", "website")
+
+
+def reference(html_content: str, url: str) -> dict:
+    news = parse_news(html_content, url)
+    return {"title": news.title, "date": news.datetime_obj, "content": news.content, "website": news.website}
+
+
+def candidate(html_content: str, url: str) -> dict:
+    page = scan_page(html_content)
+    date, _ = page.extract_date()
+    content, _ = page.extract_content()
+    return {"title": page.extract_title(), "date": date, "content": content, "website": page.extract_website(url)}
+
+
+def measure(fn, pages: list[tuple[str, str]]) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for html_content, url in pages:
+            fn(html_content, url)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def read_page(path: Path) -> str:
+    data = path.read_bytes()
+    if path.suffix == ".zst":
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        dictionary_path = path.parent / "dictionaries" / f"{dict_id}.zdict"
+        dictionary = zstandard.ZstdCompressionDict(dictionary_path.read_bytes()) if dict_id else None
+        data = zstandard.ZstdDecompressor(dict_data=dictionary).decompress(data)
+    return data.decode("utf-8", errors="replace")
+
+
+def main():
+    pages_dir = Path(os.environ["PAGES_DIR"])
+    targets: dict[str, list[tuple[str, str]]] = defaultdict(list)
+    for path in sorted([*pages_dir.glob("*/*/*.html"), *pages_dir.glob("*/*.html.zst")]):
+        target_id = path.relative_to(pages_dir).parts[0]
+        targets[target_id].append((read_page(path), str(path)))
+    if not targets:
+        logger.error(f"no pages found in {pages_dir}")
+        return
+
+    total_reference = total_candidate = 0.0
+    for target_id, pages in sorted(targets.items()):
+        same = dict.fromkeys(FIELDS, 0)
+        for html_content, url in pages:
+            expected, actual = reference(html_content, url), candidate(html_content, url)
+            for name in FIELDS:
+                if expected[name] == actual[name]:
+                    same[name] += 1
+                elif SHOW_DIFF:
+                    logger.info(f"{url}: {name} {expected[name]!r} != {actual[name]!r}")
+
+        elapsed_reference, elapsed_candidate = measure(reference, pages), measure(candidate, pages)
+        total_reference += elapsed_reference
+        total_candidate += elapsed_candidate
+        agreement = ", ".join(f"{name} {same[name] / len(pages):.0%}" for name in FIELDS)
+        logger.info(
+            f"{target_id:>5}: {len(pages):5} pages, {elapsed_reference / len(pages) * 1000:7.2f} -> "
+            f"{elapsed_candidate / len(pages) * 1000:7.2f} ms/page, same {agreement}"
+        )
+
+    logger.info(f"total: {total_reference / total_candidate:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
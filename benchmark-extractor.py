@@ -0,0 +1,72 @@
+"""Compare keyword extraction with the whole spaCy pipeline and with only the components NER needs.
+
+Sample is a JSON lines file, one article per line: `{"title": "...", "content": "..."}`,
+the same format as for benchmark-classifiers.py. Model is read from the processor configuration.
+
+SAMPLE=./sample.jsonl PROCESSOR_CONFIG=debias/processor/config.toml uv run --group processor benchmark-extractor.py
+"""
+
+import json
+import logging
+import os
+import time
+import tomllib
+
+from debias.processor.nlp.extractor import SpacyKeywordExtractor
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "8"))
+REPEATS = int(os.environ.get("REPEATS", "3"))
+
+
+def load_sample(path: str) -> list[tuple[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    return [(item["title"], item.get("content", "")) for item in items]
+
+
+def run(extractor: SpacyKeywordExtractor, articles: list[tuple[str, str]]) -> tuple[list[set[str]], float]:
+    best = float("inf")
+    for _ in range(REPEATS):
+        keywords = []
+        start = time.perf_counter()
+        for offset in range(0, len(articles), BATCH_SIZE):
+            batch = extractor.extract_unique_keywords_batch(articles[offset : offset + BATCH_SIZE])
+            keywords.extend({keyword.text for keyword in article} for article in batch)
+        best = min(best, time.perf_counter() - start)
+    return keywords, best
+
+
+def main():
+    with open(os.environ.get("PROCESSOR_CONFIG", "debias/processor/config.toml"), "rb") as f:
+        config = tomllib.load(f)
+    path, model = config.get("spacy_path", "models"), config.get("spacy_model", "en_core_web_lg")
+
+    articles = load_sample(os.environ["SAMPLE"])
+    if not articles:
+        logger.error("sample is empty")
+        return
+    logger.info(f"loaded {len(articles)} articles")
+
+    variants = {
+        "full pipeline": None,
+        "ner only": config.get("spacy_components", ["ner"]),
+    }
+
+    baseline: tuple[list[set[str]], float] | None = None
+    for name, components in variants.items():
+        extractor = SpacyKeywordExtractor(path, model, components)
+        logger.info(f"{name:>14}: components {extractor.nlp.pipe_names}")
+        keywords, elapsed = run(extractor, articles)
+        logger.info(f"{name:>14}: {len(articles) / elapsed:8.1f} docs/s, {elapsed / len(articles) * 1000:7.2f} ms/doc")
+        if baseline is None:
+            baseline = (keywords, elapsed)
+        else:
+            same = sum(a == b for a, b in zip(keywords, baseline[0], strict=True)) / len(articles)
+            logger.info(f"{'':>14}  {baseline[1] / elapsed:.1f}x faster, same keywords on {same:.0%} docs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare HTML backends of debias.core.parser.Parser on stored pages.
+
+Pages are expected in the same layout as in the S3 bucket: `{target_id}/{url_hash}/{content_hash}.html`,
+e.g. after `mc mirror s3/bucket ./pages`. Target selectors are read from the scraper configuration.
+
+PAGES_DIR=./pages SCRAPER_CONFIG=debias/scraper/config.toml uv run benchmark-parsers.py
+"""
+
+import logging
+import os
+import time
+import tomllib
+from pathlib import Path
+
+from debias.core.configs import TargetConfig
+from debias.core.documents import BACKENDS
+from debias.core.parser import Parser
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+silent = logging.getLogger("silent")
+silent.disabled = True
+
+REPEATS = int(os.environ.get("REPEATS", "3"))
+
+
+def load_pages(pages_dir: Path, targets: dict[str, TargetConfig]) -> list[tuple[TargetConfig, str]]:
+    pages = []
+    for path in sorted(pages_dir.glob("*/*/*.html")):
+        target_id = path.relative_to(pages_dir).parts[0]
+        if target_id in targets:
+            pages.append((targets[target_id], path.read_text(encoding="utf-8", errors="replace")))
+    return pages
+
+
+def run_baseline(pages: list[tuple[TargetConfig, str]]) -> None:
+    """Previous behaviour: text and hrefs are extracted from two separate html.parser trees"""
+    parsers = {config.id: Parser(config, "bs4") for config, _ in pages}
+    for config, html_content in pages:
+        parser = parsers[config.id]
+        parser.extract_text(html_content, silent)
+        parser.extract_hrefs(html_content, silent)
+
+
+def run_single_parse(pages: list[tuple[TargetConfig, str]], backend) -> None:
+    parsers = {config.id: Parser(config, backend) for config, _ in pages}
+    for config, html_content in pages:
+        parser = parsers[config.id]
+        document = parser.parse(html_content)
+        parser.extract_text(document, silent)
+        parser.extract_hrefs(document, silent)
+
+
+def measure(name: str, pages: list, fn, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(pages, *args)
+        best = min(best, time.perf_counter() - start)
+    logger.info(f"{name:>24}: {len(pages) / best:8.1f} pages/s, {best / len(pages) * 1000:7.2f} ms/page")
+    return best
+
+
+def check_agreement(pages: list[tuple[TargetConfig, str]], backend) -> float:
+    """Share of pages where backend finds the same links as bs4"""
+    same = 0
+    for config, html_content in pages:
+        expected = Parser(config, "bs4").extract_hrefs(html_content, silent)
+        actual = Parser(config, backend).extract_hrefs(html_content, silent)
+        same += sorted(expected) == sorted(actual)
+    return same / len(pages)
+
+
+def main():
+    pages_dir = Path(os.environ["PAGES_DIR"])
+    with open(os.environ.get("SCRAPER_CONFIG", "debias/scraper/config.toml"), "rb") as f:
+        config = tomllib.load(f)
+    targets = {t["id"]: TargetConfig(**t) for t in config.get("app", {}).get("targets", [])}
+
+    pages = load_pages(pages_dir, targets)
+    if not pages:
+        logger.error(f"no pages of configured targets found in {pages_dir}")
+        return
+    logger.info(f"loaded {len(pages)} pages of {len({c.id for c, _ in pages})} targets")
+
+    baseline = measure("bs4, two parses", pages, run_baseline)
+    for backend in BACKENDS:
+        elapsed = measure(f"{backend}, single parse", pages, run_single_parse, backend)
+        agreement = check_agreement(pages, backend)
+        logger.info(f"{'':>24}  {baseline / elapsed:.1f}x faster, same links on {agreement:.0%} pages")
+
+
+if __name__ == "__main__":
+    main()
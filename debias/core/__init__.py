@@ -1,4 +1,6 @@
 from . import configs as configs
+from . import dedup as dedup
+from . import documents as documents
 from . import metastore as metastore
 from . import models as models
 from . import parser as parser
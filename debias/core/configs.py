@@ -1,6 +1,6 @@
 from typing import Literal
 
-from pydantic import BaseModel, Field, HttpUrl, NatsDsn
+from pydantic import BaseModel, Field, HttpUrl, NatsDsn, model_validator
 
 
 class NatsConfig(BaseModel):
@@ -20,10 +20,56 @@ class S3Config(BaseModel):
     endpoint: str = Field(description="Endpoint for S3")
     bucket_name: str = Field(description="Bucket name for S3")
     region: str = Field(description="Region for S3")
+    max_connections: int = Field(default=32, description="Number of connections kept open to S3")
+    concurrency: int = Field(default=16, description="Maximum number of requests to S3 at once")
+    max_attempts: int = Field(default=5, description="Maximum number of attempts of a request, including retries")
+    connect_timeout: float = Field(default=5, description="Seconds to wait for a connection")
+    read_timeout: float = Field(default=30, description="Seconds to wait for a response")
+
+
+MIN_TRAIN_SAMPLES = 10
+
+
+class StorageConfig(BaseModel):
+    level: int = Field(default=9, description="zstd compression level of stored pages")
+    dictionary_size: int = Field(default=112_640, description="Size of zstd dictionaries trained per target in bytes")
+    train_samples: int = Field(
+        default=100, description="Number of pages of a target collected to train its dictionary, 0 disables training"
+    )
+    sample_size: int = Field(
+        default=32_768, description="Bytes from the start of each page used as a sample, the markup shared by pages"
+    )
+
+    @model_validator(mode="after")
+    def check_samples(self) -> "StorageConfig":
+        """zstd fails to train a dictionary on few samples, or on samples not much larger than the dictionary"""
+        if not self.train_samples:
+            return self
+        if self.train_samples < MIN_TRAIN_SAMPLES:
+            raise ValueError(f"train_samples must be 0 or at least {MIN_TRAIN_SAMPLES}")
+        if self.train_samples * self.sample_size < 10 * self.dictionary_size:
+            raise ValueError("train_samples * sample_size must be at least 10 times dictionary_size")
+        return self
 
 
 class PostgresConfig(BaseModel):
     connection: str = Field(description="Connection string for PostgreSQL")
+    min_size: int = Field(default=1, description="Number of connections the pool keeps open")
+    max_size: int = Field(default=10, description="Maximum number of connections, i.e. queries running at once")
+    prepare_threshold: int | None = Field(
+        default=0,
+        description="""Number of executions of a statement on a connection after which it is prepared.
+        Default is 0 which would prepare every statement on its first execution.
+        None disables prepared statements, e.g. behind PgBouncer in transaction mode.
+        """,
+    )
+
+
+class DedupConfig(BaseModel):
+    ttl: int = Field(default=60 * 60 * 12, description="Seconds during which the same url is not processed again")
+    local_filter: bool = Field(default=True, description="Whether to reject already seen urls without asking Redis")
+    capacity: int = Field(default=1_000_000, description="Number of urls the local filter holds before rotation")
+    error_rate: float = Field(default=0.001, description="False positive rate of the local filter")
 
 
 class TargetConfig(BaseModel):
@@ -31,6 +77,12 @@ class TargetConfig(BaseModel):
     name: str = Field(description="Human-readable name of the target")
     root: HttpUrl = Field(description="Root URL of the target")
     domain_only: bool = Field(default=True, description="Whether to visit links on other domains")
+    rate_limit: float | None = Field(
+        default=None,
+        description="""Maximum number of requests per second to the target.
+        Default is None which would use the scraper default.
+        """,
+    )
     render: Literal["auto", "always", "never"] = Field(
         default="auto",
         description="""Whether the webpage needs rendering.
@@ -50,3 +102,39 @@ class TargetConfig(BaseModel):
         Default is 'a[href]' which would find all links.
         """,
     )
+    block_resources: list[str] | None = Field(
+        default=None,
+        description="""Resource types which are not downloaded while rendering, e.g. 'image', 'font', 'script'.
+        Default is None which would use the renderer default.
+        """,
+    )
+    block_domains: list[str] = Field(
+        default_factory=list,
+        description="""Domains which are not requested while rendering, in addition to the renderer default.
+        Default is [] which would block only the renderer default domains.
+        """,
+    )
+    allow_patterns: list[str] = Field(
+        default_factory=list,
+        description="""Regular expressions of links to follow.
+        Default is [] which would follow all links.
+        """,
+    )
+    deny_patterns: list[str] = Field(
+        default_factory=list,
+        description="""Regular expressions of links to drop, e.g. tag, video or navigation pages.
+        Default is [] which would not drop any link.
+        """,
+    )
+    date_strategy: Literal["meta", "time", "json-ld", "class"] | None = Field(
+        default=None,
+        description="""Where the processor looks for the article date first.
+        Default is None which would use the strategy learned from previous pages of the target.
+        """,
+    )
+    content_strategy: Literal["article", "main", "body"] | None = Field(
+        default=None,
+        description="""Where the processor looks for the article paragraphs first.
+        Default is None which would use the strategy learned from previous pages of the target.
+        """,
+    )
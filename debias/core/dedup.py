@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+
+import redis.asyncio as aioredis
+
+from debias.core.configs import DedupConfig
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed size Bloom filter. It has no false negatives: if key is absent, it was never added"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self._size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8])
+        h2 = int.from_bytes(digest[8:]) | 1
+        for i in range(self._hashes):
+            yield (h1 + i * h2) % self._size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class Deduplicator:
+    """Claims keys (e.g. url hashes) for processing, so each key is processed once per `ttl` across replicas.
+
+    A local Bloom filter remembers keys this process has already seen and rejects them
+    without a network call. Other keys are claimed in Redis with atomic `SET NX EX`;
+    claims of concurrent handlers are coalesced into a single pipeline.
+    Local filter is rotated every `ttl / 2` seconds, so it never outlives Redis keys.
+    """
+
+    def __init__(self, keyvalue: aioredis.Redis, prefix: str, config: DedupConfig):
+        self._keyvalue = keyvalue
+        self._prefix = prefix
+        self._cfg = config
+        self._current = BloomFilter(config.capacity, config.error_rate)
+        self._previous = BloomFilter(config.capacity, config.error_rate)
+        self._rotated_at = time.monotonic()
+        self._released: set[str] = set()
+        self._pending: list[tuple[str, asyncio.Future[bool]]] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def _rotate(self) -> None:
+        expired = time.monotonic() - self._rotated_at > self._cfg.ttl / 2
+        if expired or self._current.count >= self._cfg.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self._cfg.capacity, self._cfg.error_rate)
+            self._rotated_at = time.monotonic()
+
+    def seen_locally(self, key: str) -> bool:
+        """Whether key was (probably) seen by this process. False means the key is definitely new here"""
+        if not self._cfg.local_filter or key in self._released:
+            return False
+        self._rotate()
+        return key in self._current or key in self._previous
+
+    def _remember(self, key: str) -> None:
+        if self._cfg.local_filter:
+            self._current.add(key)
+        self._released.discard(key)
+
+    async def claim(self, key: str) -> bool:
+        """Returns True if key was not seen within ttl and is now claimed by the caller"""
+        if self.seen_locally(key):
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((key, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def claim_many(self, keys: list[str]) -> list[bool]:
+        """Same as `claim` for a batch of keys, using a single Redis round trip"""
+        results = [False] * len(keys)
+        remote = [i for i, key in enumerate(keys) if not self.seen_locally(key)]
+        if remote:
+            claimed = await self._claim_remote([keys[i] for i in remote])
+            for i, ok in zip(remote, claimed, strict=True):
+                results[i] = ok
+        return results
+
+    async def seen_many(self, keys: list[str]) -> list[bool]:
+        """Checks whether keys were claimed within ttl, without claiming them"""
+        results = [True] * len(keys)
+        remote = [i for i, key in enumerate(keys) if not self.seen_locally(key)]
+        if not remote:
+            return results
+
+        async with self._keyvalue.pipeline(transaction=False) as pipe:
+            for i in remote:
+                pipe.exists(f"{self._prefix}:{keys[i]}")
+            replies = await pipe.execute()
+
+        for i, exists in zip(remote, replies, strict=True):
+            results[i] = bool(exists)
+            if exists:
+                self._remember(keys[i])
+        return results
+
+    async def release(self, key: str) -> None:
+        """Forget the claim, so the key could be processed again"""
+        self._released.add(key)
+        await self._keyvalue.delete(f"{self._prefix}:{key}")
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(0)  # let concurrent handlers enqueue their claims
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+        try:
+            claimed = await self._claim_remote([key for key, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        abandoned = []
+        for (key, future), ok in zip(pending, claimed, strict=True):
+            if not future.done():
+                future.set_result(ok)
+            elif ok:
+                abandoned.append(key)
+        # claims of cancelled callers are released, so the keys are processed when their messages are redelivered
+        for key in abandoned:
+            await self.release(key)
+
+    async def _claim_remote(self, keys: list[str]) -> list[bool]:
+        async with self._keyvalue.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(f"{self._prefix}:{key}", "1", ex=self._cfg.ttl, nx=True)
+            replies = await pipe.execute()
+        logger.debug(f"claimed {sum(bool(r) for r in replies)} of {len(keys)} keys")
+
+        for key in keys:
+            self._remember(key)  # either claimed now or already claimed by someone else
+        return [bool(reply) for reply in replies]
@@ -0,0 +1,85 @@
+from abc import ABC, abstractmethod
+from typing import Literal
+
+import lxml.html
+from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
+
+type HtmlBackend = Literal["selectolax", "lxml", "bs4"]
+
+NON_TEXT_TAGS = ["script", "style", "noscript", "template"]
+"""elements removed when a document is parsed, their contents are not text of the page"""
+
+
+class Document(ABC):
+    """HTML document which is parsed once and then queried with CSS selectors.
+
+    Elements of `NON_TEXT_TAGS` are removed, so inline scripts and styles do not count as text with any backend.
+    """
+
+    @abstractmethod
+    def select_text(self, selector: str) -> list[str]:
+        """Text of each element matching selector, with whitespace of every text node stripped"""
+
+    @abstractmethod
+    def select_attr(self, selector: str, attr: str) -> list[str | None]:
+        """Attribute value of each element matching selector"""
+
+
+class SelectolaxDocument(Document):
+    def __init__(self, html_content: str):
+        self._tree = LexborHTMLParser(html_content)
+        self._tree.strip_tags(NON_TEXT_TAGS)
+
+    def select_text(self, selector: str) -> list[str]:
+        return [node.text(strip=True) for node in self._tree.css(selector)]
+
+    def select_attr(self, selector: str, attr: str) -> list[str | None]:
+        return [node.attributes.get(attr) for node in self._tree.css(selector)]
+
+
+class LxmlDocument(Document):
+    def __init__(self, html_content: str):
+        self._tree = lxml.html.document_fromstring(html_content) if html_content.strip() else None
+        if self._tree is not None:
+            # emptied rather than dropped, so text around them stays in separate text nodes as with other backends
+            for element in list(self._tree.iter(*NON_TEXT_TAGS)):
+                element.clear(keep_tail=True)
+
+    def select_text(self, selector: str) -> list[str]:
+        if self._tree is None:
+            return []
+        return ["".join(text.strip() for text in element.itertext()) for element in self._tree.cssselect(selector)]
+
+    def select_attr(self, selector: str, attr: str) -> list[str | None]:
+        if self._tree is None:
+            return []
+        return [element.get(attr) for element in self._tree.cssselect(selector)]
+
+
+class SoupDocument(Document):
+    def __init__(self, html_content: str):
+        self._soup = BeautifulSoup(html_content, "html.parser")
+        for element in self._soup(NON_TEXT_TAGS):
+            element.decompose()
+
+    def select_text(self, selector: str) -> list[str]:
+        return [element.get_text(strip=True) for element in self._soup.select(selector)]
+
+    def select_attr(self, selector: str, attr: str) -> list[str | None]:
+        values = []
+        for element in self._soup.select(selector):
+            value = element.get(attr)
+            values.append(value if isinstance(value, str) or value is None else " ".join(value))
+        return values
+
+
+BACKENDS: dict[str, type[Document]] = {
+    "selectolax": SelectolaxDocument,
+    "lxml": LxmlDocument,
+    "bs4": SoupDocument,
+}
+
+
+def parse_html(html_content: str, backend: HtmlBackend = "selectolax") -> Document:
+    return BACKENDS[backend](html_content)
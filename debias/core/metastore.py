@@ -1,9 +1,8 @@
 import logging
-from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime
 
-import psycopg
+from debias.core.postgres import PostgresStore
 
 logger = logging.getLogger(__name__)
 
@@ -18,16 +17,13 @@ class Metadata:
     url_hash: str
     content_hash: str
     content_size: int
+    compressed_size: int | None = None
+    """size of the stored page in bytes, None for pages stored before compression"""
 
 
-class Metastore:
-    def __init__(self, connection: str):
-        self._conn_str = connection
-        self._connection: psycopg.AsyncConnection | None = None
-
+class Metastore(PostgresStore):
     async def init(self):
-        conn = await self._get_connection()
-        async with conn.cursor() as cur:
+        async with self._connection() as conn, conn.cursor() as cur:
             logger.info("creating if metadata table if not exists")
             await cur.execute("""
                 CREATE TABLE IF NOT EXISTS public.metadata (
@@ -42,36 +38,19 @@ class Metastore:
                     content_size INTEGER NOT NULL
                 );
             """)
+            await cur.execute("ALTER TABLE public.metadata ADD COLUMN IF NOT EXISTS compressed_size INTEGER;")
             await conn.commit()
 
         logger.info("created metadata table")
 
-    async def _get_connection(self) -> psycopg.AsyncConnection:
-        if self._connection is None or self._connection.closed:
-            self._connection = await psycopg.AsyncConnection.connect(self._conn_str)
-        logger.debug(f"connected to {self._connection.info}")
-        return self._connection
-
-    @asynccontextmanager
-    async def with_transaction(self):
-        async with (await self._get_connection()).transaction() as t:
-            try:
-                yield t
-            except Exception as e:
-                logger.error(f"transaction failed: {e}")
-                raise e from e
-            else:
-                logger.debug("committing transaction")
-
     async def save(self, metadata: Metadata) -> int:
-        conn = await self._get_connection()
-        async with conn.cursor() as cur:
+        async with self._connection() as conn, conn.cursor() as cur:
             await cur.execute(
                 """
                 INSERT INTO public.metadata (
                     target_id, target_name, absolute_url, last_scrape,
-                    filepath, url_hash, content_hash, content_size
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    filepath, url_hash, content_hash, content_size, compressed_size
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING id;
             """,
                 (
@@ -83,6 +62,7 @@ class Metastore:
                     metadata.url_hash,
                     metadata.content_hash,
                     metadata.content_size,
+                    metadata.compressed_size,
                 ),
             )
             result = await cur.fetchone()
@@ -90,8 +70,7 @@ class Metastore:
             return result[0]  # type: ignore
 
     async def read(self, metadata_id: int) -> Metadata | None:
-        conn = await self._get_connection()
-        async with conn.cursor() as cur:
+        async with self._connection() as conn, conn.cursor() as cur:
             await cur.execute("SELECT * FROM public.metadata WHERE id = %s;", (metadata_id,))
             result = await cur.fetchone()
             if result is None:
@@ -106,4 +85,5 @@ class Metastore:
                 url_hash=result[6],
                 content_hash=result[7],
                 content_size=result[8],
+                compressed_size=result[9],
             )
@@ -1,14 +1,14 @@
 import hashlib
+import re
 import urllib.parse as urllib
 from typing import Literal
 
-from bs4 import BeautifulSoup
-
 from debias.core.configs import TargetConfig
+from debias.core.documents import Document, HtmlBackend, parse_html
 
 
 class Parser:
-    def __init__(self, config: TargetConfig) -> None:
+    def __init__(self, config: TargetConfig, backend: HtmlBackend = "selectolax") -> None:
         self._target_config = config
         self._target_id = config.id
         self._target_name = config.name
@@ -17,6 +17,9 @@ class Parser:
         self._text_selector = config.text_selector
         self._href_selector = config.href_selector
         self._href_domain_only = config.domain_only
+        self._allow_patterns = [re.compile(pattern) for pattern in config.allow_patterns]
+        self._deny_patterns = [re.compile(pattern) for pattern in config.deny_patterns]
+        self._backend: HtmlBackend = backend
 
     @property
     def domain(self) -> str:
@@ -30,40 +33,61 @@ class Parser:
     def config(self) -> TargetConfig:
         return self._target_config
 
-    def extract_text(self, html_content: str, logger) -> str:
-        soup = BeautifulSoup(html_content, "html.parser")
-        elements = soup.select(self._text_selector)
-        if not elements:
+    def parse(self, html_content: str) -> Document:
+        """Parse page once, so the document could be passed to all extract_* methods"""
+        return parse_html(html_content, self._backend)
+
+    def _document(self, content: str | Document) -> Document:
+        return self.parse(content) if isinstance(content, str) else content
+
+    def extract_text(self, content: str | Document, logger) -> str:
+        texts = self._document(content).select_text(self._text_selector) if self._text_selector else []
+        if not texts:
             logger.warning("no text content found")
             return ""
-        return " ".join([element.get_text(strip=True) for element in elements])
+        return " ".join(texts)
 
-    def extract_hrefs(self, html_content: str, logger) -> list[str]:
-        soup = BeautifulSoup(html_content, "html.parser")
-        elements = soup.select(self._href_selector)
+    def extract_hrefs(self, content: str | Document, logger, url: str | None = None) -> list[str]:
+        """Absolute http(s) links of the page, hrefs are resolved against page `url` or the target root"""
+        values = self._document(content).select_attr(self._href_selector, "href")
+        base = url or absolute_url(self._target_domain, "/")
         hrefs = []
 
         failed = []
 
-        for element in elements:
-            href = element.get("href")
+        for href in values:
             if not isinstance(href, str) or len(href) == 0:
                 failed.append(href)
                 continue
 
-            if not self._href_domain_only:
-                hrefs.append(absolute_url(self._target_domain, href))
+            href = href.strip()
+            if not href or href.startswith("#"):
                 continue
-
-            href_domain = extract_domain(href)
-            if href_domain == self._target_domain:
-                hrefs.append(absolute_url(self._target_domain, href))
+            href = urllib.urljoin(base, href)
+            # mailto:, javascript:, tel: and alike are not pages
+            if urllib.urlsplit(href).scheme not in ("http", "https"):
+                continue
+            if not self._href_domain_only or extract_domain(href) == self._target_domain:
+                hrefs.append(href)
 
         if failed:
             logger.warning(f"failed to extract multiple sources: {failed}")
 
         return hrefs
 
+    def allows(self, url: str) -> bool:
+        """Whether link passes allow and deny patterns of the target"""
+        if self._allow_patterns and not any(pattern.search(url) for pattern in self._allow_patterns):
+            return False
+        return not any(pattern.search(url) for pattern in self._deny_patterns)
+
+    def extract_links(self, content: str | Document, url: str, logger) -> list[str]:
+        """Extract unique normalized links of the page which are allowed to be fetched"""
+        hrefs = self.extract_hrefs(content, logger, url)
+        links = {normalize_url(href) for href in hrefs}
+        links.discard(normalize_url(url))
+        return sorted(link for link in links if self.allows(link))
+
 
 def normalize_url(url: str) -> str:
     scheme, netloc, path, _, _ = urllib.urlsplit(url)
@@ -0,0 +1,66 @@
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+
+from debias.core.configs import PostgresConfig
+
+logger = logging.getLogger(__name__)
+
+
+def create_pool(config: PostgresConfig) -> AsyncConnectionPool:
+    """Connection pool shared by all stores of an app, it must be opened with `await pool.open()` before use.
+
+    Connections are checked before they are handed out, so connections broken by a database restart are replaced.
+    Statements are prepared on the server after `prepare_threshold` executions on a connection.
+    """
+    return AsyncConnectionPool(
+        config.connection,
+        min_size=config.min_size,
+        max_size=config.max_size,
+        kwargs={"prepare_threshold": config.prepare_threshold},
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+        name="debias",
+    )
+
+
+class PostgresStore:
+    """Base of stores which run their queries on connections of a shared pool.
+
+    Every task (i.e. every message handler) runs its transaction on its own connection.
+    Queries outside of `with_transaction` take a connection just for themselves and commit once done.
+    """
+
+    def __init__(self, pool: AsyncConnectionPool):
+        self._pool = pool
+        self._current: ContextVar[psycopg.AsyncConnection | None] = ContextVar(
+            f"{type(self).__name__}_connection", default=None
+        )
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """Connection of the transaction of the current task, or a connection from the pool"""
+        if (conn := self._current.get()) is not None:
+            yield conn
+            return
+        async with self._pool.connection() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def with_transaction(self) -> AsyncIterator[psycopg.AsyncTransaction]:
+        async with self._connection() as conn:
+            token = self._current.set(conn)
+            try:
+                async with conn.transaction() as t:
+                    yield t
+            except Exception as e:
+                logger.error(f"transaction failed: {e}")
+                raise e from e
+            else:
+                logger.debug("committing transaction")
+            finally:
+                self._current.reset(token)
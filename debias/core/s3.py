@@ -1,33 +1,71 @@
+import asyncio
 import logging
+from contextlib import AsyncExitStack
 
 import aiobotocore.session
+from aiobotocore.config import AioConfig
+from botocore.exceptions import ClientError
 from core.configs import S3Config
 
 logger = logging.getLogger(__name__)
 
 
 class S3Client:
+    """One S3 client per process, opened at startup with `open` and closed at shutdown with `close`.
+
+    The client keeps up to `max_connections` connections open, so TLS handshakes and credential setup
+    are not repeated for every object. At most `concurrency` requests run at once, failed requests are retried
+    up to `max_attempts` times with backoff.
+    """
+
     def __init__(self, config: S3Config):
         self.cfg = config
+        self._stack = AsyncExitStack()
+        self._client = None
+        self._semaphore = asyncio.Semaphore(config.concurrency)
+
+    async def open(self):
+        session = aiobotocore.session.get_session()
+        client_config = AioConfig(
+            max_pool_connections=self.cfg.max_connections,
+            connect_timeout=self.cfg.connect_timeout,
+            read_timeout=self.cfg.read_timeout,
+            retries={"max_attempts": self.cfg.max_attempts, "mode": "standard"},
+        )
+        self._client = await self._stack.enter_async_context(
+            session.create_client(
+                "s3",
+                region_name=self.cfg.region,
+                endpoint_url=self.cfg.endpoint,
+                aws_access_key_id=self.cfg.access_key,
+                aws_secret_access_key=self.cfg.secret_key,
+                config=client_config,
+            )
+        )
+        logger.info(f"connected to s3://{self.cfg.bucket_name} at {self.cfg.endpoint}")
 
-    async def upload(self, path: str, content: str) -> None:
+    async def close(self):
+        await self._stack.aclose()
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            raise RuntimeError("S3 client is not open")
+        return self._client
+
+    async def upload(self, path: str, content: str | bytes) -> None:
         """
         Upload content to S3 at the specified path.
 
         Args:
             path: The path where the content will be uploaded in S3
-            content: The string content to upload
+            content: The content to upload, strings are encoded as UTF-8
         """
-        session = aiobotocore.session.get_session()
-        client_kwargs = {
-            "region_name": self.cfg.region,
-            "endpoint_url": self.cfg.endpoint,
-            "aws_access_key_id": self.cfg.access_key,
-            "aws_secret_access_key": self.cfg.secret_key,
-        }
-        async with session.create_client("s3", **client_kwargs) as client:
+        body = content.encode("utf-8") if isinstance(content, str) else content
+        async with self._semaphore:
             logger.debug(f"uploading {path} to s3://{self.cfg.bucket_name}/{path}")
-            await client.put_object(Bucket=self.cfg.bucket_name, Key=path, Body=content.encode("utf-8"))  # type: ignore
+            await self.client.put_object(Bucket=self.cfg.bucket_name, Key=path, Body=body)
 
     async def download(self, path: str) -> str:
         """
@@ -39,17 +77,56 @@ class S3Client:
         Returns:
             The content as a string
         """
-        session = aiobotocore.session.get_session()
-        client_kwargs = {
-            "region_name": self.cfg.region,
-            "endpoint_url": self.cfg.endpoint,
-            "aws_access_key_id": self.cfg.access_key,
-            "aws_secret_access_key": self.cfg.secret_key,
-        }
-
-        async with session.create_client("s3", **client_kwargs) as client:
+        return (await self.download_bytes(path)).decode("utf-8")
+
+    async def download_bytes(self, path: str) -> bytes:
+        """
+        Download content from S3 at the specified path, without decoding it.
+
+        Args:
+            path: The path to download from S3
+
+        Returns:
+            The content as bytes
+        """
+        async with self._semaphore:
             logger.debug(f"downloading {path} from s3://{self.cfg.bucket_name}/{path}")
-            response = await client.get_object(Bucket=self.cfg.bucket_name, Key=path)  # type: ignore
+            response = await self.client.get_object(Bucket=self.cfg.bucket_name, Key=path)
             async with response["Body"] as stream:
-                data = await stream.read()
-                return data.decode("utf-8")
+                return await stream.read()
+
+    async def size(self, path: str) -> int | None:
+        """
+        Size of the object at the specified path, without downloading it.
+
+        Args:
+            path: The path of the object in S3
+
+        Returns:
+            Size in bytes, None if there is no object at the path
+        """
+        async with self._semaphore:
+            try:
+                response = await self.client.head_object(Bucket=self.cfg.bucket_name, Key=path)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                    return None
+                raise
+        return response["ContentLength"]
+
+    async def list_keys(self, prefix: str) -> list[str]:
+        """
+        List keys in S3 under the specified prefix.
+
+        Args:
+            prefix: The prefix of keys
+
+        Returns:
+            Keys ordered from the least to the most recently modified
+        """
+        objects = []
+        async with self._semaphore:
+            paginator = self.client.get_paginator("list_objects_v2")
+            async for page in paginator.paginate(Bucket=self.cfg.bucket_name, Prefix=prefix):
+                objects.extend(page.get("Contents", []))
+        return [item["Key"] for item in sorted(objects, key=lambda item: item["LastModified"])]
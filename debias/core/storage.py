@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+import zstandard
+from core.configs import StorageConfig
+
+from debias.core.s3 import S3Client
+
+logger = logging.getLogger(__name__)
+
+
+def page_key(target_id: str, content_hash: str) -> str:
+    """Content-addressed key of a page, the same content fetched from several urls is stored once"""
+    return f"{target_id}/{content_hash}.html.zst"
+
+
+def dictionary_key(target_id: str, dict_id: int) -> str:
+    return f"{target_id}/dictionaries/{dict_id}.zdict"
+
+
+def _compress(content: bytes, level: int, dictionary: zstandard.ZstdCompressionDict | None) -> bytes:
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+    return compressor.compress(content)
+
+
+def _decompress(data: bytes, dictionary: zstandard.ZstdCompressionDict | None) -> bytes:
+    decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressor.decompress(data)
+
+
+class PageStore:
+    """Stores pages in S3 compressed with zstd, under content-addressed keys.
+
+    Pages of a target share most of their markup, so each target gets a zstd dictionary, trained on the first
+    `sample_size` bytes of its first `train_samples` pages and stored next to them
+    under `{target_id}/dictionaries/{dict_id}.zdict`.
+    Until then pages are compressed without a dictionary. Every compressed page records id of its dictionary,
+    so pages stay readable after the dictionary is replaced, or when replicas trained their own dictionaries.
+    """
+
+    def __init__(self, s3: S3Client, config: StorageConfig):
+        self._s3 = s3
+        self._cfg = config
+        self._dictionaries: dict[int, zstandard.ZstdCompressionDict] = {}
+        """dictionaries by their id, for decompression"""
+        self._current: dict[str, zstandard.ZstdCompressionDict | None] = {}
+        """dictionary pages of a target are compressed with, for compression"""
+        self._samples: dict[str, list[bytes]] = defaultdict(list)
+        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def upload(self, path: str, target_id: str, content: str | bytes) -> int:
+        """Compress and upload page, returns its compressed size in bytes.
+
+        Keys are content-addressed, so a page which is already stored is neither compressed nor uploaded again.
+        """
+        if (size := await self._s3.size(path)) is not None:
+            logger.debug(f"{path} is already stored")
+            return size
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        dictionary = await self._dictionary(target_id, data)
+        compressed = await asyncio.to_thread(_compress, data, self._cfg.level, dictionary)
+        await self._s3.upload(path, compressed)
+        return len(compressed)
+
+    async def download(self, path: str) -> bytes:
+        """Download page and decompress it, pages stored before compression are returned as they are"""
+        data = await self._s3.download_bytes(path)
+        if not path.endswith(".zst"):
+            return data
+
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        dictionary = await self._load_dictionary(path.split("/", 1)[0], dict_id) if dict_id else None
+        return await asyncio.to_thread(_decompress, data, dictionary)
+
+    async def _dictionary(self, target_id: str, sample: bytes) -> zstandard.ZstdCompressionDict | None:
+        """Dictionary of the target, loading the latest stored one or training it once enough samples are collected"""
+        if (dictionary := self._current.get(target_id)) is not None:
+            return dictionary
+
+        async with self._locks[target_id]:
+            if target_id not in self._current:
+                keys = await self._s3.list_keys(f"{target_id}/dictionaries/")
+                latest = int(keys[-1].rsplit("/", 1)[1].removesuffix(".zdict")) if keys else None
+                self._current[target_id] = await self._load_dictionary(target_id, latest) if latest else None
+            if self._current[target_id] is not None or not self._cfg.train_samples:
+                return self._current[target_id]
+
+            samples = self._samples[target_id]
+            # zstd needs ~100x dictionary size of samples, shared markup is at the start of pages anyway
+            samples.append(sample[: self._cfg.sample_size])
+            if len(samples) < self._cfg.train_samples:
+                return None
+
+            del self._samples[target_id]
+            try:
+                dictionary = await asyncio.to_thread(zstandard.train_dictionary, self._cfg.dictionary_size, samples)
+            except zstandard.ZstdError as e:
+                # e.g. pages of the target are too short, it is retried on its next `train_samples` pages
+                logger.warning(f"failed to train dictionary of target {target_id} on {len(samples)} pages: {e}")
+                return None
+            await self._s3.upload(dictionary_key(target_id, dictionary.dict_id()), dictionary.as_bytes())
+            logger.info(f"trained dictionary {dictionary.dict_id()} of target {target_id} on {len(samples)} pages")
+            self._register(dictionary)
+            self._current[target_id] = dictionary
+            return dictionary
+
+    async def _load_dictionary(self, target_id: str, dict_id: int) -> zstandard.ZstdCompressionDict:
+        if (dictionary := self._dictionaries.get(dict_id)) is not None:
+            return dictionary
+        return await self._fetch_dictionary(dictionary_key(target_id, dict_id))
+
+    async def _fetch_dictionary(self, key: str) -> zstandard.ZstdCompressionDict:
+        dictionary = zstandard.ZstdCompressionDict(await self._s3.download_bytes(key))
+        self._register(dictionary)
+        logger.info(f"loaded dictionary {key}")
+        return dictionary
+
+    def _register(self, dictionary: zstandard.ZstdCompressionDict) -> None:
+        # tables are computed once per dictionary, rather than for every page
+        dictionary.precompute_compress(level=self._cfg.level)
+        self._dictionaries[dictionary.dict_id()] = dictionary
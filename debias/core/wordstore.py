@@ -1,11 +1,13 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime
 
-import psycopg
 import psycopg.sql
 
+from debias.core.postgres import PostgresStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,22 +44,11 @@ class Target:
     alignment: str
 
 
-class Wordstore:
-    def __init__(self, connection: str):
-        self._conn_str = connection
-        self._connection: psycopg.AsyncConnection | None = None
-
-    async def _get_connection(self) -> psycopg.AsyncConnection:
-        if self._connection is None or self._connection.closed:
-            self._connection = await psycopg.AsyncConnection.connect(self._conn_str)
-        logger.debug(f"connected to {self._connection.info}")
-        return self._connection
-
+class Wordstore(PostgresStore):
     async def init(self):
         logger.info("initializing wordstore")
 
-        conn = await self._get_connection()
-        async with conn.cursor() as cursor:
+        async with self._connection() as conn, conn.cursor() as cursor:
             logger.info("creating table targets")
             await cursor.execute("""
                 create table if not exists public.targets (
@@ -170,83 +161,180 @@ class Wordstore:
                     primary key (topic_id, document_id)
                 );
             """)
-
-    @asynccontextmanager
-    async def with_transaction(self):
-        async with (await self._get_connection()).transaction() as t:
-            try:
-                yield t
-            except Exception as e:
-                logger.error(f"transaction failed: {e}")
-                raise e from e
-            else:
-                logger.debug("committing transaction")
+            await conn.commit()
 
     async def save(self, result: ProcessingResult):
-        conn = await self._get_connection()
-        async with self.with_transaction():
-            async with conn.cursor() as c:
-                insert_document = psycopg.sql.SQL("""
-                    insert into public.documents (
-                        title, absolute_url, url_hash, target_id, scrape_datetime, article_datetime, snippet
-                    ) values (%s, %s, %s, %s, %s, %s, %s) returning id;
+        await self.save_many([result])
+
+    async def save_many(self, results: list[ProcessingResult]):
+        """Save documents with their keywords, topics and appearances in one transaction.
+
+        Rows are passed as arrays and expanded with `unnest`, so the number of statements does not depend
+        on the number of documents, keywords or topics: one to reserve document ids, one to insert documents,
+        and one per keywords and topics, which upserts them together with their appearances.
+        """
+        if not results:
+            return
+
+        async with self.with_transaction() as t:
+            async with t.connection.cursor() as c:
+                # ids are reserved up front, as rows returned by a multi-row insert are not ordered
+                reserve_ids = psycopg.sql.SQL("""
+                    select nextval(pg_get_serial_sequence('public.documents', 'id')) from generate_series(1, %s);
                 """)
-                r = await (
-                    await c.execute(
-                        insert_document,
-                        (
-                            result.title,
-                            result.absolute_url,
-                            result.url_hash,
-                            result.target_id,
-                            result.scrape_datetime,
-                            result.article_datetime,
-                            result.snippet,
-                        ),
+                document_ids = sorted(
+                    row[0] for row in await (await c.execute(reserve_ids, (len(results),))).fetchall()
+                )
+
+                insert_documents = psycopg.sql.SQL("""
+                    insert into public.documents (
+                        id, title, absolute_url, url_hash, target_id, scrape_datetime, article_datetime, snippet
                     )
-                ).fetchone()
-                if r is None:
-                    raise ValueError(f"failed to insert document <{result.absolute_url}>")
-                document_id = r[0]
-
-                # create new keywords if not exists, update count if exists
-                insert_keywords = psycopg.sql.SQL("""
-                    insert into public.keywords (type, keyword, count) values (%s, %s, 1)
-                    on conflict (type, keyword) do update set count = keywords.count + 1
-                    returning id;
-                """)
-                keyword_ids = []
-                for keyword_id in result.keywords:
-                    r = await (await c.execute(insert_keywords, (keyword_id.type, keyword_id.text))).fetchone()
-                    if r is None:
-                        raise ValueError(f"failed to insert keyword <{keyword_id.text}>")
-                    keyword_ids.append(r[0])
-
-                # create new topics if not exists, update count if exists
-                insert_topics = psycopg.sql.SQL("""
-                    insert into public.topics (type, topic, count) values (%s, %s, 1)
-                    on conflict (type, topic) do update set count = topics.count + 1
-                    returning id;
-                """)
-                topic_ids = []
-                for topic in result.topics:
-                    r = await (await c.execute(insert_topics, (topic.type, topic.text))).fetchone()
-                    if r is None:
-                        raise ValueError(f"failed to insert topic <{topic.text}>")
-                    topic_ids.append(r[0])
-
-                insert_keyword_appearances = psycopg.sql.SQL("""
-                    insert into public.keyword_appearances (keyword_id, document_id, count)
-                    values (%s, %s, 1)
-                    on conflict (keyword_id, document_id) do update set count = keyword_appearances.count + 1;
+                    select * from unnest(
+                        %s::int[], %s::text[], %s::text[], %s::text[], %s::text[],
+                        %s::timestamp[], %s::timestamp[], %s::text[]
+                    );
                 """)
-                for keyword_id in keyword_ids:
-                    await c.execute(insert_keyword_appearances, (keyword_id, document_id))
+                await c.execute(
+                    insert_documents,
+                    (
+                        document_ids,
+                        [result.title for result in results],
+                        [result.absolute_url for result in results],
+                        [result.url_hash for result in results],
+                        [result.target_id for result in results],
+                        [result.scrape_datetime for result in results],
+                        [result.article_datetime for result in results],
+                        [result.snippet for result in results],
+                    ),
+                )
 
-                insert_topic_appearances = psycopg.sql.SQL("""
-                    insert into public.topic_appearances (topic_id, document_id, count)
-                    values (%s, %s, 1)
-                    on conflict (topic_id, document_id) do update set count = topic_appearances.count + 1;
-                """)
-                for topic_id in topic_ids:
-                    await c.execute(insert_topic_appearances, (topic_id, document_id))
+                keywords = [[(k.type, k.text) for k in result.keywords] for result in results]
+                await c.execute(*_upsert_terms("keywords", "keyword", "keyword_appearances", document_ids, keywords))
+                topics = [[(t.type, t.text) for t in result.topics] for result in results]
+                await c.execute(*_upsert_terms("topics", "topic", "topic_appearances", document_ids, topics))
+
+
+class WriteBehindBuffer:
+    """Collects results saved by concurrent handlers and writes them to Wordstore together, in one transaction,
+    once `max_size` results are collected or `max_delay` seconds passed since the first one.
+
+    Counts of keywords and topics are aggregated over all buffered results, so each hot row like a popular
+    person is updated once per flush, rather than once per document by transactions contending for its lock.
+    `save` returns only after the transaction with its result is committed, so messages are acked after the flush.
+    When a flush fails, its results are saved again in halves, so only results which can not be saved fail
+    and are redelivered, rather than every result they were buffered with.
+    """
+
+    def __init__(self, wordstore: Wordstore, max_size: int, max_delay: float):
+        self._wordstore = wordstore
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._pending: list[tuple[ProcessingResult, asyncio.Future[None]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: asyncio.Task | None = None
+
+    async def save(self, result: ProcessingResult):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((result, future))
+
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_delay, self._flush)
+
+        await future
+
+    async def close(self):
+        """Write results which are still buffered"""
+        self._flush()
+        while self._running is not None:
+            await asyncio.wait([self._running])
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending and self._running is None:
+            batch, self._pending = self._pending[: self._max_size], self._pending[self._max_size :]
+            self._running = asyncio.create_task(self._write(batch))
+        # otherwise flushed again when the running write is done, one transaction at a time
+
+    async def _write(self, batch: list[tuple[ProcessingResult, asyncio.Future[None]]]) -> None:
+        logger.debug(f"saving {len(batch)} documents")
+        try:
+            await self._save(batch)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()  # no-op for results which were already saved
+            raise
+        finally:
+            self._running = None
+            self._flush()
+
+    async def _save(self, batch: list[tuple[ProcessingResult, asyncio.Future[None]]]) -> None:
+        """Save batch in one transaction, if it fails save each half separately, so only bad results fail"""
+        try:
+            await self._wordstore.save_many([result for result, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                logger.warning(f"failed to save {len(batch)} documents together, saving them in halves: {e}")
+                middle = len(batch) // 2
+                await self._save(batch[:middle])
+                await self._save(batch[middle:])
+                return
+            _, future = batch[0]
+            if not future.done():
+                future.set_exception(e)
+        else:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+
+def _upsert_terms(
+    table: str, column: str, appearances: str, document_ids: list[int], terms: list[list[tuple[str, str]]]
+) -> tuple[psycopg.sql.Composed, tuple]:
+    """Statement which creates new keywords or topics, increments count of existing ones and inserts appearances.
+
+    Counts are aggregated beforehand, as a single upsert can not update a row twice,
+    and terms are sorted, so concurrent transactions lock rows in the same order and do not deadlock.
+    """
+    term_counts: Counter[tuple[str, str]] = Counter()
+    appearance_counts: Counter[tuple[int, str, str]] = Counter()
+    for document_id, document_terms in zip(document_ids, terms, strict=True):
+        for term_type, text in document_terms:
+            term_counts[(term_type, text)] += 1
+            appearance_counts[(document_id, term_type, text)] += 1
+    upserted = sorted(term_counts)
+    appeared = sorted(appearance_counts)
+
+    query = psycopg.sql.SQL("""
+        with upserted as (
+            insert into {table} (type, {column}, count)
+            select * from unnest(%s::text[], %s::text[], %s::int[])
+            on conflict (type, {column}) do update set count = {table}.count + excluded.count
+            returning id, type, {column}
+        )
+        insert into {appearances} ({term_id}, document_id, count)
+        select upserted.id, appeared.document_id, appeared.count
+        from unnest(%s::int[], %s::text[], %s::text[], %s::int[]) as appeared(document_id, type, term, count)
+        join upserted on upserted.type = appeared.type and upserted.{column} = appeared.term
+        on conflict ({term_id}, document_id) do update set count = {appearances}.count + excluded.count;
+    """).format(
+        table=psycopg.sql.Identifier("public", table),
+        column=psycopg.sql.Identifier(column),
+        appearances=psycopg.sql.Identifier("public", appearances),
+        term_id=psycopg.sql.Identifier(f"{column}_id"),
+    )
+    params = (
+        [term_type for term_type, _ in upserted],
+        [text for _, text in upserted],
+        [term_counts[term] for term in upserted],
+        [document_id for document_id, _, _ in appeared],
+        [term_type for _, term_type, _ in appeared],
+        [text for _, _, text in appeared],
+        [appearance_counts[appearance] for appearance in appeared],
+    )
+    return query, params
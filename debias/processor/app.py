@@ -1,17 +1,21 @@
 import logging
 
-from core.wordstore import Wordstore
+import redis.asyncio as aioredis
+from core.wordstore import ProcessingResult, Wordstore, WriteBehindBuffer
 from faststream import ContextRepo, FastStream, Logger
 from faststream.exceptions import RejectMessage
 from faststream.nats import NatsBroker, NatsMessage
-from processor.processor import WebpageData, process_webpage
+from processor.processor import PageRejected, WebpageData
 
 from debias.core.metastore import Metadata, Metastore
 from debias.core.models import ProcessRequest
+from debias.core.postgres import create_pool
 from debias.core.s3 import S3Client
+from debias.core.storage import PageStore
+from debias.processor.batching import MicroBatcher
+from debias.processor.cache import ResultCache
 from debias.processor.config import Config
-from debias.processor.nlp.classifier import ZeroShotClassifier
-from debias.processor.nlp.extractor import SpacyKeywordExtractor
+from debias.processor.workers import WorkerPool
 
 broker = NatsBroker(pedantic=True)
 app = FastStream(broker)
@@ -31,10 +35,19 @@ class DI:
         # type: ignore
         cls.config = Config()  # type: ignore
         cls.s3 = S3Client(cls.config.s3)
-        cls.metastore = Metastore(cls.config.pg.connection)
-        cls.wordstore = Wordstore(cls.config.pg.connection)
-        cls.keyword_extractor = SpacyKeywordExtractor(cls.config.spacy_path, cls.config.spacy_model)
-        cls.classifier = ZeroShotClassifier(cls.config.transformers_model)
+        cls.pages = PageStore(cls.s3, cls.config.storage)
+        # one pool shared by all stores, each handler runs its transaction on its own connection
+        cls.pg = create_pool(cls.config.pg)
+        cls.metastore = Metastore(cls.pg)
+        cls.wordstore = Wordstore(cls.pg)
+        cls.writes = WriteBehindBuffer(cls.wordstore, cls.config.writes.size, cls.config.writes.max_delay)
+        cls.keyvalue = aioredis.Redis.from_url(cls.config.keyvalue.dsn) if cls.config.keyvalue else None
+        cls.cache = ResultCache(cls.config.cache, cls.keyvalue)
+        cls.workers = WorkerPool(cls.config)
+        # one batch per worker, so all workers are kept busy
+        cls.batcher = MicroBatcher(
+            cls.workers.process, cls.config.batch.size, cls.config.batch.max_delay, max_running=cls.workers.size
+        )
 
 
 @app.on_startup
@@ -45,6 +58,19 @@ async def app_on_startup(context: ContextRepo, config: str):
     DI.init(config)
 
     context.set_global("config", DI.config)
+    # models are loaded before any message is accepted,
+    # and before connections are opened, as fork mode must fork before anything starts threads (e.g. DNS lookups)
+    await DI.workers.init()
+
+    # opened before the broker is connected, as handlers may run before after_startup
+    await DI.pg.open(wait=True)
+    await DI.s3.open()
+
+    # subscriber is registered here, as number of concurrent handlers is known only after config is loaded
+    # handlers wait for their batch, so there must be enough of them to fill it up
+    broker.subscriber(subject="process-queue", stream="debias", max_workers=DI.config.batch.concurrency)(
+        broker_stream_subscriber
+    )
 
     await broker.connect(DI.config.nats.dsn.encoded_string())
 
@@ -63,10 +89,13 @@ async def app_on_shutdown(context: ContextRepo, logger: Logger):
     """Lifespan hook that is called when application is shutting down
     after it stops accepting any request or declaring queues
     """
+    await DI.writes.close()
+    await DI.workers.close()
+    await DI.s3.close()
+    await DI.pg.close()
     logger.info("app shutdown")
 
 
-@broker.subscriber(subject="process-queue", stream="debias")
 async def broker_stream_subscriber(msg: NatsMessage, data: ProcessRequest, logger: Logger, context: ContextRepo):
     """Handler which process each message from the queue.
     It subscribes to subject "process-queue", so all messages published exactly to "process-queue" subject
@@ -86,24 +115,49 @@ async def broker_stream_subscriber(msg: NatsMessage, data: ProcessRequest, logge
         logger.info("recevied message with invalid metadata id, rejecting it")
         raise RejectMessage()  # raise it to completely reject message
 
-    content = await DI.s3.download(data.filepath)
-
-    result = process_webpage(
-        DI.keyword_extractor,
-        DI.classifier,
-        WebpageData(
-            url=data.url,
-            target_id=data.target_id,
-            filepath=data.filepath,
-            content=content,
-            metadata=data.metadata,
-            datetime=data.datetime,
-        ),
-    )
+    cached = await DI.cache.get(metainfo.content_hash)
+    if cached is not None:
+        if cached.result is not None and cached.result.absolute_url == data.url:
+            logger.info(f"content of {data.url} is already processed and saved, skipping it")
+            return
+        logger.info(f"content {metainfo.content_hash} is already processed, reusing result")
+        result = cached.for_page(data.url, data.target_id, data.datetime)
+    else:
+        result = await process(data, metainfo, logger)
+
     logger.info(f"message successfully processed {result}")
     if result is None:
         logger.info("failed to process webpage, rejecting it")
         raise RejectMessage()  # raise it to completely reject message
 
-    await DI.wordstore.save(result)
+    # returns once the transaction with this result is committed, so message is acked only after that
+    await DI.writes.save(result)
     logger.info(f"message successfully saved {result}")
+    if cached is None:
+        # cached only once saved, so a failed save is retried with full processing
+        await DI.cache.set(metainfo.content_hash, result)
+
+
+async def process(data: ProcessRequest, metainfo: Metadata, logger: Logger) -> ProcessingResult | None:
+    """Download page and run it through parsing and models, caching pages which are not articles"""
+    content = await DI.pages.download(data.filepath)
+
+    try:
+        result = await DI.batcher.submit(
+            WebpageData(
+                url=data.url,
+                target_id=data.target_id,
+                filepath=data.filepath,
+                content=content,
+                metadata=data.metadata,
+                datetime=data.datetime,
+            )
+        )
+    except PageRejected as e:
+        logger.info(f"page {data.url} is not an article, {e}")
+        await DI.cache.set(metainfo.content_hash, None)
+        raise RejectMessage() from e
+
+    if result is None:
+        await DI.cache.set(metainfo.content_hash, None)
+    return result
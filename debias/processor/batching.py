@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher[T, R]:
+    """Collects items submitted by concurrent handlers into batches of up to `max_size` items
+    or `max_delay` seconds, whichever comes first, and processes each batch with a single call.
+
+    At most `max_running` batches are processed at once: items submitted meanwhile form the next batch,
+    which starts as soon as one of the running batches is done.
+    Batch function returns one result per item, an exception instance fails only its own item.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list[T]], Awaitable[list[R | Exception]]],
+        max_size: int,
+        max_delay: float,
+        max_running: int = 1,
+    ):
+        self._fn = fn
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._max_running = max_running
+        self._pending: list[tuple[T, asyncio.Future[R]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending and len(self._running) < self._max_running:
+            batch, self._pending = self._pending[: self._max_size], self._pending[self._max_size :]
+            self._running.add(asyncio.create_task(self._run(batch)))
+        # otherwise flushed again when one of running batches is done
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future[R]]]) -> None:
+        logger.debug(f"processing batch of {len(batch)} items")
+        try:
+            results = await self._fn([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self._running.discard(asyncio.current_task())
+        self._flush()
@@ -0,0 +1,69 @@
+import dataclasses
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import redis.asyncio as aioredis
+from pydantic import TypeAdapter
+
+from debias.core.wordstore import ProcessingResult
+from debias.processor.config import CacheConfig
+
+logger = logging.getLogger(__name__)
+
+RESULT = TypeAdapter(ProcessingResult | None)
+
+
+@dataclass
+class CacheEntry:
+    result: ProcessingResult | None
+    """None if page with this content is not an article"""
+
+    def for_page(self, url: str, target_id: str, scrape_datetime) -> ProcessingResult | None:
+        """Cached result with fields of the page which is processed now"""
+        if self.result is None:
+            return None
+        return dataclasses.replace(
+            self.result, absolute_url=url, url_hash=url, target_id=target_id, scrape_datetime=scrape_datetime
+        )
+
+
+class ResultCache:
+    """Caches processing results by content hash, so the same content is parsed and run through models once.
+
+    Recrawled pages, pages fetched by both scraper and renderer, and syndicated articles share content hash.
+    Results are kept in a local LRU of `size` entries, or in Redis under `processed:{content_hash}` for `ttl` seconds.
+    """
+
+    def __init__(self, config: CacheConfig, keyvalue: aioredis.Redis | None = None):
+        if config.backend == "redis" and keyvalue is None:
+            raise ValueError("redis result cache requires keyvalue configuration")
+        self._cfg = config
+        self._keyvalue = keyvalue
+        self._local: OrderedDict[str, bytes] = OrderedDict()
+
+    async def get(self, content_hash: str) -> CacheEntry | None:
+        match self._cfg.backend:
+            case "local":
+                payload = self._local.get(content_hash)
+                if payload is not None:
+                    self._local.move_to_end(content_hash)
+            case "redis":
+                payload = await self._keyvalue.get(f"processed:{content_hash}")
+            case _:
+                return None
+
+        if payload is None:
+            return None
+        return CacheEntry(result=RESULT.validate_json(payload))
+
+    async def set(self, content_hash: str, result: ProcessingResult | None) -> None:
+        payload = RESULT.dump_json(result)
+        match self._cfg.backend:
+            case "local":
+                self._local[content_hash] = payload
+                self._local.move_to_end(content_hash)
+                while len(self._local) > self._cfg.size:
+                    self._local.popitem(last=False)
+            case "redis":
+                await self._keyvalue.set(f"processed:{content_hash}", payload, ex=self._cfg.ttl)
@@ -1,8 +1,8 @@
 import importlib.metadata
-from typing import ClassVar, override
+from typing import ClassVar, Literal, override
 
-from core.configs import NatsConfig, PostgresConfig, S3Config
-from pydantic import Field
+from core.configs import NatsConfig, PostgresConfig, S3Config, StorageConfig, TargetConfig
+from pydantic import BaseModel, Field
 from pydantic_settings import (
     BaseSettings,
     PydanticBaseSettingsSource,
@@ -11,13 +11,81 @@ from pydantic_settings import (
 )
 
 
+class BatchConfig(BaseModel):
+    size: int = Field(default=8, description="Maximum number of pages processed by models at once")
+    max_delay: float = Field(default=0.1, description="Seconds to wait for a batch to fill up before processing it")
+    concurrency: int = Field(default=16, description="Number of messages handled at once, to fill up batches")
+
+
+class WriteConfig(BaseModel):
+    size: int = Field(default=16, description="Maximum number of results saved in one transaction")
+    max_delay: float = Field(default=0.2, description="Seconds to wait for more results before saving them")
+
+
+class WorkerConfig(BaseModel):
+    mode: Literal["thread", "process", "fork"] = Field(
+        default="thread",
+        description="Run models in threads sharing one copy of models, in processes each loading its own copy, "
+        "or in processes forked after models are loaded, sharing them copy-on-write",
+    )
+    size: int = Field(default=1, description="Number of workers, i.e. batches processed at once")
+    threads: int | None = Field(default=None, description="Number of torch threads per worker, torch default if unset")
+
+
+class KeyValueConfig(BaseModel):
+    dsn: str = Field(description="Redis DSN")
+
+
+class CacheConfig(BaseModel):
+    backend: Literal["none", "local", "redis"] = Field(
+        default="local", description="Where processing results are cached by content hash"
+    )
+    size: int = Field(default=10_000, description="Number of results kept by local cache")
+    ttl: int = Field(default=60 * 60 * 24 * 7, description="Seconds during which results are kept in Redis")
+
+
+class ProfileConfig(BaseModel):
+    enabled: bool = Field(default=True, description="Whether to learn where dates and content are found per target")
+    min_samples: int = Field(default=20, description="Number of probed pages before a strategy is tried first")
+    confidence: float = Field(default=0.9, description="Share of probed pages which must agree on a strategy")
+    probe_every: int = Field(default=100, description="Extract every n-th page in the default order to revalidate")
+    window: int = Field(default=200, description="Number of observations after which old ones are aged")
+
+
 class Config(BaseSettings):
     nats: NatsConfig = Field(default_factory=NatsConfig, description="NATS configuration")
     s3: S3Config = Field(description="S3 configuration")
+    storage: StorageConfig = Field(default_factory=StorageConfig, description="Compression of stored pages")
     pg: PostgresConfig = Field(description="PostgreSQL configuration")
+    keyvalue: KeyValueConfig | None = Field(default=None, description="Key-Value configuration")
     spacy_path: str = Field(default="models", description="Path to models directory")
     spacy_model: str = Field(default="en_core_web_lg", description="Spacy model name")
+    spacy_components: list[str] | None = Field(
+        default=["ner"], description="Spacy pipeline components to load, all components if unset"
+    )
     transformers_model: str = Field(default="facebook/bart-large-mnli", description="Transformers model name")
+    classifier: Literal["zero-shot", "embedding"] = Field(
+        default="zero-shot",
+        description="Classify with zero-shot NLI over every label, or by similarity of article and label embeddings",
+    )
+    classifier_backend: Literal["torch", "onnx"] = Field(
+        default="torch", description="Run zero-shot classifier with torch, or with int8 ONNX export of the model"
+    )
+    onnx_model: str = Field(
+        default="models/bart-large-mnli-int8", description="Path to ONNX export of transformers model"
+    )
+    embedding_model: str = Field(
+        default="sentence-transformers/all-MiniLM-L6-v2", description="Sentence embedding model name"
+    )
+    label_cache: str = Field(default="models/labels", description="Directory to cache label embeddings in")
+    targets: list[TargetConfig] = Field(
+        default_factory=list, description="Targets with explicit date and content strategies"
+    )
+    profiles: ProfileConfig = Field(default_factory=ProfileConfig, description="Learned extraction strategies")
+    cache: CacheConfig = Field(default_factory=CacheConfig, description="Cache of processing results")
+    batch: BatchConfig = Field(default_factory=BatchConfig, description="Micro-batching of model inference")
+    writes: WriteConfig = Field(default_factory=WriteConfig, description="Write-behind buffering of results")
+    workers: WorkerConfig = Field(default_factory=WorkerConfig, description="Pool which runs parsing and models")
 
     @property
     def version(self) -> str:
@@ -1,13 +1,44 @@
-from transformers import pipeline
+import hashlib
+import logging
+import os
+import tempfile
+from typing import TYPE_CHECKING, Protocol
 
 from debias.processor.nlp.config import NEWS_CATEGORIES
 from debias.processor.nlp.utils import normalize_text
 
+# torch, transformers and onnxruntime are imported when a classifier is created,
+# so importing the processor (e.g. to validate configuration) does not load them
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HYPOTHESIS_TEMPLATE = "This example is {}."
+ONNX_FILE = "model.int8.onnx"
+LABEL_TEMPLATE = "This news article is about {}."
+EMBEDDING_MAX_TOKENS = 256
+
+
+class Classifier(Protocol):
+    def classify(self, title: str, content: str = "") -> str: ...
+
+    def classify_batch(self, articles: list[tuple[str, str]], normalized: bool = False) -> list[str]: ...
+
+
+def article_text(title: str, content: str = "", normalized: bool = False) -> str:
+    text = title if normalized else normalize_text(title)
+    if content:
+        text = f"{text} {content if normalized else normalize_text(content)}"
+    return text
+
 
 class ZeroShotClassifier:
     """Classify news articles with zero-shot classification"""
 
     def __init__(self, model: str):
+        from transformers import pipeline
+
         super().__init__()
         self.classifier = pipeline(
             "zero-shot-classification",
@@ -16,9 +47,171 @@ class ZeroShotClassifier:
         )
 
     def classify(self, title: str, content: str = "") -> str:
-        text = normalize_text(title)
-        if content:
-            text = f"{text} {normalize_text(content)}"
+        return self.classify_batch([(title, content)])[0]
+
+    def classify_batch(self, articles: list[tuple[str, str]], normalized: bool = False) -> list[str]:
+        """Classify (title, content) pairs with a single batched pipeline call"""
+        texts = [article_text(title, content, normalized) for title, content in articles]
+        results = self.classifier(
+            texts,
+            NEWS_CATEGORIES,
+            multi_label=False,
+            hypothesis_template=HYPOTHESIS_TEMPLATE,
+            batch_size=max(1, len(texts)),
+        )
+        return [result["labels"][0] for result in results]
+
+
+class OnnxZeroShotClassifier:
+    """Zero-shot classification with an NLI model exported to ONNX and dynamically quantized to int8.
+
+    Gives the same labels as ZeroShotClassifier up to quantization error:
+    the label with the highest entailment logit among all (article, label) pairs.
+    """
+
+    def __init__(self, path: str, threads: int | None = None, load_session: bool = True):
+        """
+        Args:
+            path: Directory with the ONNX export, its tokenizer and config
+            threads: Number of intra-op threads of the session, onnxruntime default (one per core) if None
+            load_session: Whether to create the inference session now, otherwise `load_session` must be called
+                before classifying. onnxruntime is not fork-safe, so forked workers create their own session.
+        """
+        from transformers import AutoConfig, AutoTokenizer
+
+        config = AutoConfig.from_pretrained(path)
+        self.entailment = next(i for label, i in config.label2id.items() if label.lower().startswith("entail"))
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.path = path
+        self.threads = threads
+        self.session = None
+        self.input_names: set[str] = set()
+        self.hypotheses = [HYPOTHESIS_TEMPLATE.format(label) for label in NEWS_CATEGORIES]
+        if load_session:
+            self.load_session()
+
+    def load_session(self):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(self.path, ONNX_FILE), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def classify(self, title: str, content: str = "") -> str:
+        return self.classify_batch([(title, content)])[0]
+
+    def classify_batch(self, articles: list[tuple[str, str]], normalized: bool = False) -> list[str]:
+        """Classify (title, content) pairs with a single forward pass over all (article, label) pairs"""
+        texts = [article_text(title, content, normalized) for title, content in articles]
+        premises = [text for text in texts for _ in self.hypotheses]
+        hypotheses = self.hypotheses * len(texts)
+
+        encoded = self.tokenizer(premises, hypotheses, padding=True, truncation="only_first", return_tensors="np")
+        inputs = {name: value for name, value in encoded.items() if name in self.input_names}
+        (logits,) = self.session.run(["logits"], inputs)
+
+        scores = logits[:, self.entailment].reshape(len(texts), len(self.hypotheses))
+        return [NEWS_CATEGORIES[index] for index in scores.argmax(axis=1)]
+
+
+class EmbeddingClassifier:
+    """Classify news articles by similarity of their sentence embedding to embeddings of labels.
+
+    Each article is encoded once, instead of once per label as with zero-shot NLI.
+    Label embeddings are computed once and cached in `cache_dir`, keyed by model and labels.
+    """
+
+    def __init__(self, model: str, cache_dir: str):
+        from transformers import AutoModel, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModel.from_pretrained(model)
+        self.model.eval()
+        self.labels = self._label_embeddings(model, cache_dir)
+
+    def _label_embeddings(self, model: str, cache_dir: str) -> "np.ndarray":
+        import numpy as np
+
+        key = "\n".join([model, LABEL_TEMPLATE, *NEWS_CATEGORIES])
+        path = os.path.join(cache_dir, f"{hashlib.sha256(key.encode()).hexdigest()[:16]}.npy")
+        if os.path.exists(path):
+            return np.load(path)
+
+        logger.info(f"computing label embeddings with {model}")
+        embeddings = self.encode([LABEL_TEMPLATE.format(label) for label in NEWS_CATEGORIES])
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # written to a temporary file and renamed, so concurrent workers never load a partially written file
+            with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".npy.tmp", delete=False) as f:
+                try:
+                    np.save(f, embeddings)
+                    f.close()
+                    os.replace(f.name, path)
+                except BaseException:
+                    os.unlink(f.name)
+                    raise
+        except OSError as e:
+            # e.g. models directory is mounted read-only
+            logger.warning(f"failed to cache label embeddings in {cache_dir}: {e}")
+        return embeddings
+
+    def encode(self, texts: list[str]) -> "np.ndarray":
+        """Mean-pooled, L2-normalized sentence embeddings"""
+        import torch
+
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=EMBEDDING_MAX_TOKENS, return_tensors="pt"
+        )
+        with torch.inference_mode():
+            hidden = self.model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=1)
+        return pooled.numpy()
+
+    def classify(self, title: str, content: str = "") -> str:
+        return self.classify_batch([(title, content)])[0]
+
+    def classify_batch(self, articles: list[tuple[str, str]], normalized: bool = False) -> list[str]:
+        """Classify (title, content) pairs with one encoder pass and a dot product with label embeddings"""
+        embeddings = self.encode([article_text(title, content, normalized) for title, content in articles])
+        scores = embeddings @ self.labels.T
+        return [NEWS_CATEGORIES[index] for index in scores.argmax(axis=1)]
+
+
+def export_onnx(model: str, path: str):
+    """Export NLI model to ONNX and quantize its weights to int8, so it can be loaded by OnnxZeroShotClassifier"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    nli = AutoModelForSequenceClassification.from_pretrained(model, use_cache=False, return_dict=False)
+    nli.eval()
+
+    os.makedirs(path, exist_ok=True)
+    fp32_file = os.path.join(path, "model.onnx")
+    sample = tokenizer(["premise"], [HYPOTHESIS_TEMPLATE.format("label")], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            nli,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_file,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=17,
+        )
 
-        result = self.classifier(text, NEWS_CATEGORIES, multi_label=False)
-        return result["labels"][0]
+    quantize_dynamic(fp32_file, os.path.join(path, ONNX_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_file)
+    tokenizer.save_pretrained(path)
+    nli.config.save_pretrained(path)
@@ -1,13 +1,12 @@
+import functools
 import re
 
-import nltk
-
 # Regex patterns
 WHITESPACE_PATTERN = re.compile(r"\s+")
 SPECIAL_CHARS_PATTERN = re.compile(r"[^\w\s]")
 
-# Enhanced stopwords for news context
-STOP_WORDS: set[str] = set(nltk.corpus.stopwords.words("english")).union({
+# Stopwords specific to news context
+NEWS_STOP_WORDS = {
     "said",
     "says",
     "told",
@@ -30,7 +29,16 @@ STOP_WORDS: set[str] = set(nltk.corpus.stopwords.words("english")).union({
     "week",
     "month",
     "year",
-})
+}
+
+
+@functools.cache
+def stop_words() -> frozenset[str]:
+    """English stopwords enhanced for news context, NLTK corpus is loaded on the first call rather than at import"""
+    import nltk
+
+    return frozenset(nltk.corpus.stopwords.words("english")).union(NEWS_STOP_WORDS)
+
 
 PUBLISHER_NAMES = {
     "skynews",
@@ -69,6 +77,10 @@ NEWS_CATEGORIES = [
     "environment",
 ]
 
+# Article checks, run before any model
+MIN_CONTENT_LENGTH = 200
+MIN_STOPWORD_RATIO = 0.15
+
 # Output settings
 SNIPPET_LENGTH = 200
 MAX_KEYWORDS = 8
@@ -1,7 +1,5 @@
 import os
 
-import spacy
-
 from debias.processor.nlp.config import MAX_KEYWORDS
 from debias.processor.nlp.models import Keyword
 from debias.processor.nlp.utils import clean_text, is_valid_keyword, normalize_text
@@ -10,33 +8,55 @@ from debias.processor.nlp.utils import clean_text, is_valid_keyword, normalize_t
 class SpacyKeywordExtractor:
     """Base class for keyword extraction using spaCy"""
 
-    def __init__(self, path: str, model: str):
-        self.nlp = spacy.load(os.path.join(path, model))
+    def __init__(self, path: str, model: str, components: list[str] | None = None):
+        """Load spaCy model with only `components` of its pipeline, or with the whole pipeline if None.
+
+        NER of en_core_web_* models has its own embedding layer, so ["ner"] is enough for keywords.
+        Other components are not loaded at all, which saves both time and memory.
+        """
+        import spacy
+
+        model_path = os.path.join(path, model)
+        exclude = []
+        if components is not None:
+            meta = spacy.util.load_meta(os.path.join(model_path, "meta.json"))
+            exclude = [name for name in meta.get("components", meta["pipeline"]) if name not in components]
+        self.nlp = spacy.load(model_path, exclude=exclude)
 
     def extract_unique_keywords(self, title: str, content: str = "") -> list[Keyword]:
         """Extract unique keywords using spaCy NER"""
-        normalized_title = normalize_text(title)
-        normalized_content = normalize_text(content) if content else ""
+        return self.extract_unique_keywords_batch([(title, content)])[0]
+
+    def extract_unique_keywords_batch(
+        self, articles: list[tuple[str, str]], normalized: bool = False
+    ) -> list[list[Keyword]]:
+        """Extract unique keywords of (title, content) pairs, running spaCy over the whole batch at once.
+        Pass `normalized` if title and content are already normalized, so they are not normalized again.
+        """
+        texts = []
+        for title, content in articles:
+            normalized_title = title if normalized else normalize_text(title)
+            normalized_content = content if normalized else normalize_text(content)
 
-        # Combine with title repeated for emphasis
-        text_to_process = f"{normalized_title} {normalized_title} {normalized_content}"
+            # title goes first, so its entities come first in doc.ents and are kept by MAX_KEYWORDS cut
+            texts.append(f"{normalized_title}\n{normalized_content}")
 
-        doc = self.nlp(text_to_process)
+        return [self._keywords(doc) for doc in self.nlp.pipe(texts, batch_size=max(1, len(texts)))]
+
+    def _keywords(self, doc) -> list[Keyword]:
         entities = []
         seen_texts = set()
 
         # Process named entities
         for ent in doc.ents:
             entity_text = clean_text(ent.text)
+            entity_key = entity_text.lower()
 
-            if not is_valid_keyword(entity_text):
-                continue
-
-            if entity_text.lower() in seen_texts:
+            if entity_key in seen_texts or not is_valid_keyword(entity_text):
                 continue
 
             entities.append(Keyword(text=entity_text, type=ent.label_))
-            seen_texts.add(entity_text.lower())
+            seen_texts.add(entity_key)
 
         # Return top keywords
         return entities[:MAX_KEYWORDS]
@@ -0,0 +1,35 @@
+import re
+from collections.abc import Iterable
+
+_END = ""
+
+
+def _trie_pattern(node: dict) -> str:
+    """Render trie as a regular expression, so phrases sharing a prefix share its matching"""
+    if _END in node:
+        return ""  # longer phrases with this prefix can not change whether text contains a phrase
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items())]
+    return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+
+class PhraseMatcher:
+    """Finds any of many phrases in a text with a single regular expression, compiled from a trie of the phrases.
+
+    Matching cost grows with the length of the text rather than with the number of phrases,
+    unlike checking `phrase in text` for every phrase.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        trie: dict = {}
+        for phrase in phrases:
+            if not phrase:
+                continue
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[_END] = {}
+        self._pattern = re.compile(_trie_pattern(trie)) if trie else None
+
+    def search(self, text: str) -> bool:
+        """Whether text contains any of the phrases"""
+        return self._pattern is not None and self._pattern.search(text) is not None
@@ -0,0 +1,191 @@
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import urlparse
+
+import dateutil.parser
+import lxml.etree
+import lxml.html
+
+from debias.processor.nlp.config import MAX_CONTENT_LENGTH
+from debias.processor.nlp.utils import clean_text
+
+DATE_META_ATTRIBUTES = ("pubdate", "publishdate", "timestamp", "date")
+DATE_STRATEGIES = ("meta", "time", "json-ld", "class")
+CONTENT_STRATEGIES = ("article", "main", "body")
+MAX_BODY_PARAGRAPHS = 30
+
+
+def element_text(element: lxml.html.HtmlElement) -> str:
+    """Text of element with each text node stripped, same as BeautifulSoup get_text(strip=True)"""
+    return "".join(text.strip() for text in element.itertext())
+
+
+def parse_date(value: str) -> datetime | None:
+    """Parse date, trying cheap ISO-8601 parsing before dateutil"""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return dateutil.parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+
+
+def json_ld_dates(script: str) -> list[str]:
+    try:
+        data = json.loads(script)
+    except ValueError:
+        return []
+    items = data if isinstance(data, list) else [data]
+    dates = []
+    for item in items:
+        if isinstance(item, dict) and (date := item.get("datePublished") or item.get("dateModified")):
+            dates.append(str(date))
+    return dates
+
+
+@dataclass
+class PageScan:
+    """Everything the processor extracts from a page, collected in a single traversal of an lxml tree.
+
+    Date candidates and paragraphs are kept per strategy, in document order.
+    Candidates are raw attribute values, scripts or elements, they are turned into text and parsed only when asked for.
+    """
+
+    title: str | None = None
+    headline: str | None = None
+    """first h1 which looks like a headline, by its class"""
+    first_h1: str | None = None
+    site_name: str | None = None
+    canonical: str | None = None
+    dates: dict[str, list[str | lxml.html.HtmlElement]] = field(
+        default_factory=lambda: {strategy: [] for strategy in DATE_STRATEGIES}
+    )
+    paragraphs: dict[str, list[str]] = field(default_factory=lambda: {strategy: [] for strategy in CONTENT_STRATEGIES})
+
+    def extract_title(self) -> str:
+        return clean_text(self.title or self.headline or self.first_h1 or "No title found")
+
+    def extract_date(self, strategies=DATE_STRATEGIES) -> tuple[datetime | None, str | None]:
+        """Returns first date which could be parsed and the strategy which found it"""
+        for strategy in strategies:
+            for value in self.date_candidates(strategy):
+                if (parsed := parse_date(value)) is not None:
+                    return parsed, strategy
+        return None, None
+
+    def date_candidates(self, strategy: str) -> Iterator[str]:
+        for candidate in self.dates[strategy]:
+            if not isinstance(candidate, str):
+                yield candidate.text_content()
+            elif strategy == "json-ld":
+                yield from json_ld_dates(candidate)
+            else:
+                yield candidate
+
+    def extract_content(self, strategies=CONTENT_STRATEGIES) -> tuple[str, str | None]:
+        """Returns content of the first container which has paragraphs and the strategy which found it"""
+        for strategy in strategies:
+            if paragraphs := self.paragraphs[strategy]:
+                return clean_text(" ".join(paragraphs)[:MAX_CONTENT_LENGTH]), strategy
+        return "", None
+
+    def extract_website(self, url: str | None) -> str:
+        if self.site_name:
+            return self.site_name
+        if self.canonical:
+            return urlparse(self.canonical).netloc.replace("www.", "")
+        if url:
+            return urlparse(url).netloc.replace("www.", "")
+        return "Unknown"
+
+
+class _Scanner:
+    """State of a traversal: which containers are open and how much content is already collected"""
+
+    def __init__(self):
+        self.scan = PageScan()
+        self.open: dict[str, lxml.html.HtmlElement | None] = {"article": None, "main": None}
+        self.seen: set[str] = set()
+        self.length = {"article": 0, "main": 0}
+
+    def start(self, element: lxml.html.HtmlElement):
+        tag = element.tag
+        if tag in self.open and tag not in self.seen:
+            self.seen.add(tag)  # only the first article and main are used
+            self.open[tag] = element
+        elif tag == "meta":
+            self.meta(element)
+        elif tag == "time":
+            self.scan.dates["time"].append(element.get("datetime") or element)
+        elif tag == "link" and self.scan.canonical is None and "canonical" in (element.get("rel") or "").split():
+            self.scan.canonical = element.get("href") or None
+        elif tag == "script" and element.get("type") == "application/ld+json" and element.text:
+            self.scan.dates["json-ld"].append(element.text)
+
+        if "date" in (element.get("class") or "").lower():
+            self.scan.dates["class"].append(element)
+
+    def meta(self, element: lxml.html.HtmlElement):
+        content = element.get("content")
+        if not content:
+            return
+        if any(attribute in element.attrib for attribute in DATE_META_ATTRIBUTES):
+            self.scan.dates["meta"].append(content)
+        if self.scan.site_name is None and element.get("property") == "og:site_name":
+            self.scan.site_name = content
+
+    def end(self, element: lxml.html.HtmlElement):
+        tag = element.tag
+        if tag == "p":
+            self.paragraph(element_text(element))
+        elif tag == "title" and self.scan.title is None:
+            self.scan.title = element.text or None
+        elif tag == "h1":
+            text = element_text(element)
+            if self.scan.first_h1 is None:
+                self.scan.first_h1 = text
+            css_class = (element.get("class") or "").lower()
+            if self.scan.headline is None and ("headline" in css_class or "title" in css_class):
+                self.scan.headline = text or None
+        elif tag in self.open and self.open[tag] is element:
+            self.open[tag] = None
+
+    def paragraph(self, text: str):
+        for container in ("article", "main"):
+            if self.open[container] is not None and self.length[container] <= MAX_CONTENT_LENGTH:
+                self.scan.paragraphs[container].append(text)
+                self.length[container] += len(text) + 1
+        if len(self.scan.paragraphs["body"]) < MAX_BODY_PARAGRAPHS:
+            self.scan.paragraphs["body"].append(text)
+
+
+def scan_page(html_content: str | bytes) -> PageScan:
+    """Parse page with lxml and collect title, date candidates, site name and paragraphs in one traversal.
+
+    Bytes are parsed as UTF-8, the encoding pages are stored in, without decoding them to str first.
+    """
+    scanner = _Scanner()
+    if isinstance(html_content, bytes):
+        # parser per call, as lxml parsers can not be shared by threads
+        root = lxml.html.document_fromstring(html_content, parser=lxml.html.HTMLParser(encoding="utf-8"))
+    else:
+        try:
+            root = lxml.html.document_fromstring(html_content)
+        except ValueError:
+            # lxml does not accept str with an XML encoding declaration
+            root = lxml.html.document_fromstring(html_content.encode())
+    for event, element in lxml.etree.iterwalk(root, events=("start", "end")):
+        if not isinstance(element.tag, str):
+            continue  # comments and processing instructions
+        if event == "start":
+            scanner.start(element)
+        else:
+            scanner.end(element)
+    return scanner.scan
@@ -1,7 +1,10 @@
 import os
 import json
 from datetime import datetime
-from debias.processor.nlp.config import WHITESPACE_PATTERN, SPECIAL_CHARS_PATTERN, STOP_WORDS, PUBLISHER_NAMES
+from debias.processor.nlp.config import WHITESPACE_PATTERN, SPECIAL_CHARS_PATTERN, PUBLISHER_NAMES, stop_words
+from debias.processor.nlp.matcher import PhraseMatcher
+
+PUBLISHERS = PhraseMatcher(PUBLISHER_NAMES)
 
 
 def clean_text(text: str) -> str:
@@ -20,6 +23,15 @@ def normalize_text(text: str) -> str:
     return clean_text(text.lower())
 
 
+def stopword_ratio(normalized_text: str) -> float:
+    """Share of English stop words among words of normalized text, low for other languages and for lists of links"""
+    words = normalized_text.split()
+    if not words:
+        return 0.0
+    stop = stop_words()
+    return sum(word in stop for word in words) / len(words)
+
+
 def get_all_html_files(root_dir: str) -> list[str]:
     """Get all HTML files recursively"""
     html_files = []
@@ -32,12 +44,14 @@ def get_all_html_files(root_dir: str) -> list[str]:
 
 def is_valid_keyword(keyword: str) -> bool:
     """Check if a keyword is valid"""
+    lowered = keyword.lower()
+
     # Skip stopwords, numbers
-    if keyword.lower() in STOP_WORDS or keyword.replace(" ", "").isdigit():
+    if lowered in stop_words() or keyword.replace(" ", "").isdigit():
         return False
 
-    # Return all publisher names
-    if any(term in keyword.lower() for term in PUBLISHER_NAMES):
+    # Skip keywords mentioning publisher names
+    if PUBLISHERS.search(lowered):
         return False
 
     return True
@@ -1,13 +1,17 @@
+from contextlib import AbstractContextManager, nullcontext
 from datetime import datetime
 
+import lxml.etree
 from core.wordstore import Keyword, ProcessingResult, Topic
 from pydantic import BaseModel
 
-from debias.processor.nlp.classifier import ZeroShotClassifier
-from debias.processor.nlp.config import SNIPPET_LENGTH
+from debias.processor.nlp.classifier import Classifier
+from debias.processor.nlp.config import MIN_CONTENT_LENGTH, MIN_STOPWORD_RATIO, SNIPPET_LENGTH
 from debias.processor.nlp.extractor import SpacyKeywordExtractor
 from debias.processor.nlp.models import FormattedNewsData, RawNewsData
-from debias.processor.nlp.parser import parse_news
+from debias.processor.nlp.scan import CONTENT_STRATEGIES, DATE_STRATEGIES, scan_page
+from debias.processor.nlp.utils import stopword_ratio
+from debias.processor.profiles import ExtractionProfiles
 
 
 class WebpageData(BaseModel):
@@ -17,32 +21,96 @@ class WebpageData(BaseModel):
     """id of the target from the config"""
     filepath: str
     """filepath in s3 storage"""
-    content: str
-    """downloaded file content as string"""
+    content: str | bytes
+    """downloaded file content, bytes are UTF-8 encoded"""
     metadata: int
     """metadata id in metastore"""
     datetime: datetime
     """scraped at"""
 
 
+class PageRejected(ValueError):
+    """Raised by a stage of the pipeline, when page turns out not to be an article"""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"rejected at {stage} stage: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+def parse_html_content(
+    html_content: str | bytes,
+    url,
+    target_id: str | None = None,
+    profiles: ExtractionProfiles | None = None,
+) -> RawNewsData:
+    """Run cheap stages of the pipeline, cheapest first, so pages which are not articles never reach models:
+    HTML parse, title, date, minimum content length, language.
+    With `profiles`, date and content are looked for where they were found on previous pages of the target first.
+
+    Raises:
+        PageRejected: with the stage which rejected the page and the reason
+    """
+    if not html_content.strip():
+        raise PageRejected("parse", "page is empty")
+    try:
+        page = scan_page(html_content)
+    except lxml.etree.ParserError as e:
+        raise PageRejected("parse", str(e)) from e
+
+    title = page.extract_title()
+    if not title or title == "No title found":
+        raise PageRejected("title", "no valid title found")
+
+    date_order = profiles.order(target_id, "date") if profiles else DATE_STRATEGIES
+    datetime_obj, date_strategy = page.extract_date(date_order)
+    if profiles:
+        profiles.record(target_id, "date", date_order, date_strategy)
+    if datetime_obj is None:
+        raise PageRejected("date", "no article date found")
+
+    content_order = profiles.order(target_id, "content") if profiles else CONTENT_STRATEGIES
+    content, content_strategy = page.extract_content(content_order)
+    if profiles:
+        profiles.record(target_id, "content", content_order, content_strategy)
+    if len(content) < MIN_CONTENT_LENGTH:
+        raise PageRejected("content", f"content is too short ({len(content)} characters)")
+
+    # title and content are already cleaned, so lowercasing is all that is left of normalization
+    content_normalized = content.lower()
+    ratio = stopword_ratio(content_normalized)
+    if ratio < MIN_STOPWORD_RATIO:
+        raise PageRejected("language", f"content does not look like English text ({ratio:.0%} stop words)")
+
+    return RawNewsData(
+        title=title,
+        title_normalized=title.lower(),
+        datetime_obj=datetime_obj,
+        website=page.extract_website(url),
+        content=content,
+        content_normalized=content_normalized,
+        source_file=url,
+    )
+
+
 def process_html_content(
-    html_content: str,
+    html_content: str | bytes,
     url,
     keyword_extractor: SpacyKeywordExtractor,
-    classifier: ZeroShotClassifier,
+    classifier: Classifier,
 ) -> RawNewsData:
     """Process HTML content and return the extracted data"""
-    news_data = parse_news(html_content, url)
-    news_data.source_file = url
-
-    if not news_data.title or news_data.title == "No title found":
-        raise ValueError("No valid title found")
+    news_data = parse_html_content(html_content, url)
 
     if keyword_extractor:
-        news_data.keywords_data = keyword_extractor.extract_unique_keywords(news_data.title, news_data.content)
+        news_data.keywords_data = keyword_extractor.extract_unique_keywords_batch(
+            [(news_data.title_normalized, news_data.content_normalized)], normalized=True
+        )[0]
 
     if classifier:
-        news_data.category = classifier.classify(news_data.title_normalized, news_data.content_normalized)
+        news_data.category = classifier.classify_batch(
+            [(news_data.title_normalized, news_data.content_normalized)], normalized=True
+        )[0]
 
     return news_data
 
@@ -64,9 +132,7 @@ def format_output(news_data: RawNewsData) -> FormattedNewsData:
     )
 
 
-def process_webpage(keyword_extractor, classifier, input: WebpageData) -> ProcessingResult | None:
-    html_content = input.content
-    news_data = process_html_content(html_content, input.url, keyword_extractor, classifier)
+def to_processing_result(input: WebpageData, news_data: RawNewsData) -> ProcessingResult | None:
     formatted_data = format_output(news_data)
 
     snippet = formatted_data.snippet
@@ -89,3 +155,49 @@ def process_webpage(keyword_extractor, classifier, input: WebpageData) -> Proces
         keywords=keywords,
         topics=topics,
     )
+
+
+def process_webpage(keyword_extractor, classifier, input: WebpageData) -> ProcessingResult | None:
+    html_content = input.content
+    news_data = process_html_content(html_content, input.url, keyword_extractor, classifier)
+    return to_processing_result(input, news_data)
+
+
+def process_webpages(
+    keyword_extractor: SpacyKeywordExtractor,
+    classifier: Classifier,
+    inputs: list[WebpageData],
+    profiles: ExtractionProfiles | None = None,
+    models_lock: AbstractContextManager | None = None,
+) -> list[ProcessingResult | None | Exception]:
+    """Process a batch of webpages, running models once over all parsed articles.
+
+    Models run while holding `models_lock`, pages are parsed without it.
+    Returns one entry per input: result, None if page is not an article, or PageRejected raised by its stage.
+    """
+    models_lock = models_lock or nullcontext()
+    parsed: list[RawNewsData | Exception] = []
+    for input in inputs:
+        try:
+            parsed.append(parse_html_content(input.content, input.url, input.target_id, profiles))
+        except PageRejected as e:
+            parsed.append(e)
+
+    articles = [news_data for news_data in parsed if isinstance(news_data, RawNewsData)]
+    texts = [(n.title_normalized, n.content_normalized) for n in articles]
+    if articles and keyword_extractor:
+        with models_lock:
+            keywords = keyword_extractor.extract_unique_keywords_batch(texts, normalized=True)
+        for news_data, keywords_data in zip(articles, keywords, strict=True):
+            news_data.keywords_data = keywords_data
+
+    if articles and classifier:
+        with models_lock:
+            categories = classifier.classify_batch(texts, normalized=True)
+        for news_data, category in zip(articles, categories, strict=True):
+            news_data.category = category
+
+    return [
+        news_data if isinstance(news_data, Exception) else to_processing_result(input, news_data)
+        for input, news_data in zip(inputs, parsed, strict=True)
+    ]
@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Literal
+
+from debias.core.configs import TargetConfig
+from debias.processor.config import ProfileConfig
+from debias.processor.nlp.scan import CONTENT_STRATEGIES, DATE_STRATEGIES
+
+type Kind = Literal["date", "content"]
+
+STRATEGIES: dict[Kind, tuple[str, ...]] = {"date": DATE_STRATEGIES, "content": CONTENT_STRATEGIES}
+
+
+@dataclass
+class StrategyStats:
+    hits: Counter[str] = field(default_factory=Counter)
+    since_probe: int = 0
+
+
+class ExtractionProfiles:
+    """Learns which strategy finds the date and the content of pages, per target.
+
+    Once enough pages of a target agree, the learned strategy is tried first and the rest only if it finds nothing.
+    Every `probe_every`-th page of a target is still extracted in the default order, so the profile follows site changes.
+    Strategies set in TargetConfig are always tried first and are not learned.
+    """
+
+    def __init__(self, config: ProfileConfig, targets: list[TargetConfig]):
+        self._cfg = config
+        self._overrides: dict[tuple[str, Kind], str] = {}
+        for target in targets:
+            if target.date_strategy:
+                self._overrides[(target.id, "date")] = target.date_strategy
+            if target.content_strategy:
+                self._overrides[(target.id, "content")] = target.content_strategy
+        self._stats: dict[tuple[str, Kind], StrategyStats] = defaultdict(StrategyStats)
+
+    def order(self, target_id: str, kind: Kind) -> tuple[str, ...]:
+        """Strategies in the order they should be tried for the next page of the target"""
+        default = STRATEGIES[kind]
+        first = self._overrides.get((target_id, kind)) or self._predict(target_id, kind)
+        if first is None:
+            return default
+        return (first, *(strategy for strategy in default if strategy != first))
+
+    def _predict(self, target_id: str, kind: Kind) -> str | None:
+        if not self._cfg.enabled:
+            return None
+
+        stats = self._stats[(target_id, kind)]
+        total = stats.hits.total()
+        if total < self._cfg.min_samples or stats.since_probe >= self._cfg.probe_every:
+            return None
+
+        strategy, hits = stats.hits.most_common(1)[0]
+        if hits < total * self._cfg.confidence:
+            return None
+        stats.since_probe += 1
+        return strategy
+
+    def record(self, target_id: str, kind: Kind, order: tuple[str, ...], strategy: str | None) -> None:
+        """Record strategy which found the date or the content, when strategies were tried in `order`"""
+        if strategy is None or (target_id, kind) in self._overrides:
+            return
+
+        stats = self._stats[(target_id, kind)]
+        probed = order == STRATEGIES[kind]
+        if not probed and strategy == order[0]:
+            return  # learned strategy worked, only probes and misses are counted to not reinforce it
+        stats.hits[strategy] += 1
+        if probed:
+            stats.since_probe = 0
+
+        if stats.hits.total() > self._cfg.window:
+            # age old observations, so recent pages outweigh them
+            for key in stats.hits:
+                stats.hits[key] //= 2
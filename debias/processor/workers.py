@@ -0,0 +1,161 @@
+import asyncio
+import gc
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import AbstractContextManager, nullcontext
+
+from debias.processor.config import Config, WorkerConfig
+from debias.processor.nlp.classifier import (
+    Classifier,
+    EmbeddingClassifier,
+    OnnxZeroShotClassifier,
+    ZeroShotClassifier,
+)
+from debias.processor.nlp.config import stop_words
+from debias.processor.nlp.extractor import SpacyKeywordExtractor
+from debias.processor.processor import ProcessingResult, WebpageData, process_webpages
+from debias.processor.profiles import ExtractionProfiles
+
+logger = logging.getLogger(__name__)
+
+
+class Models:
+    """Models and extraction profiles loaded once per worker process (or once per app in thread mode)"""
+
+    keyword_extractor: SpacyKeywordExtractor
+    classifier: Classifier
+    profiles: ExtractionProfiles
+    lock: AbstractContextManager = nullcontext()
+    """held while running models, a real lock only when threads share them"""
+
+    @classmethod
+    def load(cls, config: Config, fork: bool = False):
+        """Load models, with `fork` those which can not be shared by forked workers are left to `fork_init`"""
+        start = time.perf_counter()
+        set_threads(config.workers)
+
+        cls.keyword_extractor = SpacyKeywordExtractor(config.spacy_path, config.spacy_model, config.spacy_components)
+        match (config.classifier, config.classifier_backend):
+            case ("embedding", _):
+                cls.classifier = EmbeddingClassifier(config.embedding_model, config.label_cache)
+            case ("zero-shot", "onnx"):
+                cls.classifier = OnnxZeroShotClassifier(
+                    config.onnx_model, config.workers.threads, load_session=not fork
+                )
+            case ("zero-shot", "torch"):
+                cls.classifier = ZeroShotClassifier(config.transformers_model)
+        cls.profiles = ExtractionProfiles(config.profiles, config.targets)
+        stop_words()  # loaded now, so forked workers share it
+        logger.info(f"models loaded in process {os.getpid()} in {time.perf_counter() - start:.1f}s")
+
+
+def set_threads(config: WorkerConfig):
+    if config.threads:
+        import torch
+
+        torch.set_num_threads(config.threads)
+
+
+def fork_init(config: WorkerConfig):
+    """Initializer of forked workers"""
+    set_threads(config)
+    if isinstance(Models.classifier, OnnxZeroShotClassifier):
+        # onnxruntime thread pools do not survive fork, so each worker creates its own session
+        Models.classifier.load_session()
+
+
+def memory_usage(pid: int | str = "self") -> tuple[float, float] | None:
+    """Resident and private memory of a process in MB, None where /proc is not available.
+
+    Pages shared copy-on-write with the parent count to resident but not to private memory.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            next(smaps)  # address range of the rollup
+            fields = {key: int(value.split()[0]) for key, value in (line.split(":", 1) for line in smaps)}
+    except (OSError, StopIteration, ValueError):
+        return None
+    return fields["Rss"] / 1024, (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024
+
+
+def process_batch(inputs: list[WebpageData]) -> list[ProcessingResult | None | Exception]:
+    """Runs in a worker, with models which were loaded by its initializer"""
+    return process_webpages(Models.keyword_extractor, Models.classifier, inputs, Models.profiles, Models.lock)
+
+
+class WorkerPool:
+    """Runs parsing and model inference outside of the event loop.
+
+    In "process" mode each of `size` worker processes loads its own models once, when it starts.
+    In "fork" mode models are loaded once in the app process, which then forks `size` workers sharing them copy-on-write.
+    In "thread" mode models are loaded once and shared by `size` threads, which parse pages in parallel
+    but take turns running models, as tokenizers and spaCy pipelines are not thread-safe.
+    """
+
+    def __init__(self, config: Config):
+        self._cfg: WorkerConfig = config.workers
+        self._config = config
+        self._executor: Executor | None = None
+
+    @property
+    def size(self) -> int:
+        return self._cfg.size
+
+    async def init(self):
+        start = time.perf_counter()
+        match self._cfg.mode:
+            case "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._cfg.size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=Models.load,
+                    initargs=(self._config,),
+                )
+            case "fork":
+                # loaded in this thread, not in to_thread, as no other thread should be running when the process forks
+                if threading.active_count() > 1:
+                    logger.warning(f"forking with {threading.active_count()} threads running, workers may deadlock")
+                Models.load(self._config, fork=True)
+                # objects loaded so far are never collected, so garbage collector does not write to their shared pages
+                gc.freeze()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._cfg.size,
+                    mp_context=multiprocessing.get_context("fork"),
+                    initializer=fork_init,
+                    initargs=(self._cfg,),
+                )
+            case "thread":
+                await asyncio.to_thread(Models.load, self._config)
+                # fast tokenizers and spaCy pipelines must not be called from several threads at once
+                Models.lock = threading.Lock()
+                self._executor = ThreadPoolExecutor(max_workers=self._cfg.size, thread_name_prefix="processor-worker")
+
+        # start all workers now, so models are loaded before the first message arrives
+        await asyncio.gather(*[self._submit(os.getpid) for _ in range(self._cfg.size)])
+        self.report_memory()
+        logger.info(f"started {self._cfg.size} {self._cfg.mode} workers in {time.perf_counter() - start:.1f}s")
+
+    def report_memory(self):
+        """Log memory of every worker process, or of the app process in thread mode"""
+        pids = [process.pid for process in multiprocessing.active_children()] or [os.getpid()]
+        for pid in sorted(pids):
+            if (usage := memory_usage(pid)) is None:
+                logger.info(f"memory of worker {pid} is unknown, /proc is not available")
+                continue
+            rss, private = usage
+            logger.info(f"worker {pid}: {rss:.0f} MB resident, {private:.0f} MB private")
+
+    async def close(self):
+        if self._executor is not None:
+            await asyncio.to_thread(self._executor.shutdown, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def process(self, inputs: list[WebpageData]) -> list[ProcessingResult | None | Exception]:
+        """Parse pages and run models over them in one of the workers"""
+        return await self._submit(process_batch, inputs)
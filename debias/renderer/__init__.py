@@ -1,5 +1,6 @@
 from . import config as config
 from . import renderer as renderer
+from . import workers as workers
 from .app import app as app
 from .config import Config as Config
 from .renderer import Renderer as Renderer
@@ -7,13 +7,18 @@ from core.parser import Parser
 from faststream import ContextRepo, FastStream, Logger
 from faststream.exceptions import AckMessage, NackMessage, RejectMessage
 from faststream.nats import NatsBroker, NatsMessage
+from playwright.async_api import Error as PlaywrightError
 from renderer.renderer import Renderer
+from renderer.workers import RenderError, RenderSupervisor
 
+from debias.core.dedup import Deduplicator
 from debias.core.metastore import Metadata, Metastore
 from debias.core.models import FetchRequest, ProcessRequest, RenderRequest
+from debias.core.postgres import create_pool
 from debias.core.s3 import S3Client
+from debias.core.storage import PageStore, page_key
 from debias.renderer.config import Config
-from debias.renderer.utils import absolute_url, extract_domain, hashsum, normalize_url
+from debias.renderer.utils import extract_domain, hashsum, normalize_url
 
 broker = NatsBroker(pedantic=True)
 app = FastStream(broker)
@@ -31,10 +36,18 @@ class DI:
         # type: ignore
         cls.config = Config()  # type: ignore
         cls.keyvalue = aioredis.Redis.from_url(cls.config.keyvalue.dsn)
+        cls.seen = Deduplicator(cls.keyvalue, "render:url_hash", cls.config.dedup)
+        cls.scraped = Deduplicator(cls.keyvalue, "scrape:url_hash", cls.config.dedup)
         cls.s3 = S3Client(cls.config.s3)
-        cls.metastore = Metastore(cls.config.pg.connection)
+        cls.pages = PageStore(cls.s3, cls.config.storage)
+        # one pool shared by all stores, each handler runs its transaction on its own connection
+        cls.pg = create_pool(cls.config.pg)
+        cls.metastore = Metastore(cls.pg)
         cls.parsers: dict[str, Parser | None] = defaultdict(lambda: None)
-        cls.renderer = Renderer()
+        if cls.config.browser.workers > 0:
+            cls.renderer = RenderSupervisor(cls.config.browser, cls.config.http.user_agent)
+        else:
+            cls.renderer = Renderer(cls.config.browser, cls.config.http.user_agent)
 
         cls.fetch_queue_publisher = broker.publisher(subject="fetch-queue", stream="debias")
         cls.process_queue_publisher = broker.publisher(subject="process-queue", stream="debias")
@@ -48,12 +61,19 @@ async def app_on_startup(context: ContextRepo, config: str):
     """
     DI.init(config)
     context.set_global("config", DI.config)
+    # opened before the broker is connected, as handlers may run before after_startup
+    await DI.pg.open(wait=True)
+    await DI.s3.open()
 
     for target_config in DI.config.app.targets:
-        parser = Parser(target_config)
+        parser = Parser(target_config, DI.config.app.html_backend)
         DI.parsers[parser.domain] = parser
     await DI.renderer.init()
 
+    # subscriber is registered here, as number of concurrent handlers is known only after config is loaded
+    concurrency = DI.config.browser.pool_size * max(1, DI.config.browser.workers)
+    broker.subscriber(subject="render-queue", stream="debias", max_workers=concurrency)(broker_stream_subscriber)
+
     await broker.connect(DI.config.nats.dsn.encoded_string())
 
 
@@ -71,9 +91,10 @@ async def app_on_shutdown(context: ContextRepo):
     after it stops accepting any request or declaring queues
     """
     await DI.renderer.close()
+    await DI.s3.close()
+    await DI.pg.close()
 
 
-@broker.subscriber(subject="render-queue", stream="debias")
 async def broker_stream_subscriber(msg: NatsMessage, data: RenderRequest, logger: Logger, context: ContextRepo):
     """Handler which process each message from the queue.
     It subscribes to subject "render-queue", so all messages published exactly to "render-queue" subject
@@ -81,6 +102,7 @@ async def broker_stream_subscriber(msg: NatsMessage, data: RenderRequest, logger
     It subscribes to stream "debias" with retention policy "work_queue".
     This allows multiple subscribers to connect to the same stream and receive unqiue messages
     i.e. each message is received only once by only one subscriber).
+    Up to `browser.pool_size` messages per browser worker are rendered concurrently.
 
     Read more about JetStream & Pulling Consumer here:
     - https://docs.nats.io/nats-concepts/jetstream
@@ -97,17 +119,19 @@ async def broker_stream_subscriber(msg: NatsMessage, data: RenderRequest, logger
 
     logger.debug(f"checking if url {url} was rendered in last 12 hours")
     url_hash = hashsum(url)
-    key = f"render:url_hash:{url_hash}"
-    if (await DI.keyvalue.get(key)) is not None:
+    if not await DI.seen.claim(url_hash):  # expires in 12 hours
         logger.warning(f"skipping url {url}: url_hash {url_hash} is present")
         raise RejectMessage()  # refuse to process
     logger.debug(f"url hash {url_hash} is not present, processing url")
-    await DI.keyvalue.set(key, "1", ex=60 * 60 * 12)  # expires in 12 hours
 
-    content = await DI.renderer.render(url)
+    try:
+        content = await DI.renderer.render(url, parser.config)
+    except (TimeoutError, PlaywrightError, RenderError) as e:
+        logger.warning(f"failed to render {url}: {e}")
+        raise RejectMessage() from e  # refuse to process
     content_hash = hashsum(content)
 
-    filepath = f"{parser.config.id}/{url_hash}/{content_hash}.html"
+    filepath = page_key(parser.config.id, content_hash)
 
     await finish(logger, parser, url, url_hash, content, content_hash, filepath)
     raise AckMessage()
@@ -124,7 +148,7 @@ async def finish(
 ):
     try:
         async with DI.metastore.with_transaction():
-            await DI.s3.upload(filepath, content)
+            compressed_size = await DI.pages.upload(filepath, parser.config.id, content)
 
             metadata_id = await DI.metastore.save(
                 Metadata(
@@ -136,6 +160,7 @@ async def finish(
                     url_hash=url_hash,
                     content_hash=content_hash,
                     content_size=len(content),
+                    compressed_size=compressed_size,
                 )
             )
 
@@ -153,8 +178,10 @@ async def finish(
         raise NackMessage() from e
 
     try:
-        next_urls = parser.extract_hrefs(content, logger)
-        urls = [normalize_url(absolute_url(extract_domain(url), next_url)) for next_url in next_urls]
+        next_urls = parser.extract_links(content, url, logger)
+        seen = await DI.scraped.seen_many([hashsum(next_url) for next_url in next_urls])
+        urls = [next_url for next_url, is_seen in zip(next_urls, seen, strict=True) if not is_seen]
+        logger.debug(f"spawning {len(urls)} fetch requests, {len(next_urls) - len(urls)} links were seen recently")
         await asyncio.gather(*[DI.fetch_queue_publisher.publish(FetchRequest(url=next_url)) for next_url in urls])
     except Exception as e:
         logger.warning(f"failed to spawn new fetch requests: {e}")
@@ -1,7 +1,8 @@
 import importlib.metadata
 from typing import ClassVar, override
 
-from core.configs import HttpConfig, NatsConfig, PostgresConfig, S3Config, TargetConfig
+from core.configs import DedupConfig, HttpConfig, NatsConfig, PostgresConfig, S3Config, StorageConfig, TargetConfig
+from core.documents import HtmlBackend
 from pydantic import BaseModel, Field
 from pydantic_settings import (
     BaseSettings,
@@ -13,19 +14,60 @@ from pydantic_settings import (
 
 class AppConfig(BaseModel):
     targets: list[TargetConfig] = Field(default_factory=list, description="Targets configuration")
+    html_backend: HtmlBackend = Field(default="selectolax", description="HTML parser used to extract text and links")
 
 
 class KeyValueConfig(BaseModel):
     dsn: str = Field(description="Redis DSN")
 
 
+class BrowserConfig(BaseModel):
+    workers: int = Field(
+        default=0,
+        description="Number of browser worker processes. Default is 0 which would render in the main process",
+    )
+    stats_interval: float = Field(default=60.0, description="Seconds between logging stats of browser workers")
+    pool_size: int = Field(default=4, description="Number of pages rendered concurrently by each browser")
+    recycle_after: int = Field(default=100, description="Number of renders after which browser context is recreated")
+    timeout: float = Field(default=30.0, description="Seconds to wait for a page to render")
+    settle_timeout: float = Field(
+        default=5.0,
+        description="Seconds to wait for text_selector or network idle after the document is loaded",
+    )
+    block_resources: list[str] = Field(
+        default_factory=lambda: ["image", "media", "font"],
+        description="Resource types which are not downloaded, unless target overrides them",
+    )
+    block_domains: list[str] = Field(
+        default_factory=lambda: [
+            "doubleclick.net",
+            "googlesyndication.com",
+            "googletagmanager.com",
+            "google-analytics.com",
+            "googletagservices.com",
+            "amazon-adsystem.com",
+            "facebook.net",
+            "scorecardresearch.com",
+            "chartbeat.com",
+            "chartbeat.net",
+            "hotjar.com",
+            "taboola.com",
+            "outbrain.com",
+        ],
+        description="Ads and analytics domains which are not requested for any target",
+    )
+
+
 class Config(BaseSettings):
     nats: NatsConfig = Field(default_factory=NatsConfig, description="NATS configuration")
     http: HttpConfig = Field(default_factory=HttpConfig, description="HTTP configuration")
     app: AppConfig = Field(default_factory=AppConfig, description="Application configuration")
     s3: S3Config = Field(description="S3 configuration")
+    storage: StorageConfig = Field(default_factory=StorageConfig, description="Compression of stored pages")
     pg: PostgresConfig = Field(description="PostgreSQL configuration")
     keyvalue: KeyValueConfig = Field(description="Key-Value configuration")
+    dedup: DedupConfig = Field(default_factory=DedupConfig, description="Seen urls deduplication configuration")
+    browser: BrowserConfig = Field(default_factory=BrowserConfig, description="Browser pool configuration")
 
     @property
     def version(self) -> str:
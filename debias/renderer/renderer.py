@@ -1,20 +1,126 @@
-from playwright.async_api import async_playwright
+import asyncio
+import logging
+import urllib.parse as urllib
+from dataclasses import dataclass
+
+from playwright.async_api import Browser, BrowserContext, Page, Route, async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from debias.core.configs import TargetConfig
+from debias.renderer.config import BrowserConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolSlot:
+    context: BrowserContext | None = None
+    """context is created lazily, when slot is used for the first time"""
+    renders: int = 0
+
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    """Resources which are aborted while rendering pages of a target"""
+
+    resource_types: frozenset[str]
+    domains: tuple[str, ...]
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+        host = urllib.urlsplit(url).hostname or ""
+        return any(host == domain or host.endswith("." + domain) for domain in self.domains)
 
 
 class Renderer:
-    def __init__(self):
-        pass
+    """Renders pages in a pool of browser contexts.
+
+    At most `pool_size` pages are rendered at once, each page is closed after rendering
+    and a context is replaced with a fresh one after `recycle_after` renders to keep memory bounded.
+    """
+
+    def __init__(self, config: BrowserConfig, user_agent: str | None = None):
+        self._cfg = config
+        self._user_agent = user_agent
+        self._slots: asyncio.Queue[PoolSlot] = asyncio.Queue()
+        self._policies: dict[str, ResourcePolicy] = {}
 
     async def init(self):
         self._playwright = await async_playwright().start()
-        self._browser = await self._playwright.chromium.launch()
+        self._browser: Browser = await self._playwright.chromium.launch()
+        for _ in range(self._cfg.pool_size):
+            self._slots.put_nowait(PoolSlot())
 
     async def close(self):
+        while not self._slots.empty():
+            await self._recycle(self._slots.get_nowait())
         await self._browser.close()
         await self._playwright.stop()
 
-    async def render(self, url: str) -> str:
-        page = await self._browser.new_page()
-        await page.goto(url)
-        await page.pause()
-        return await page.content()
+    @property
+    def is_connected(self) -> bool:
+        return self._browser.is_connected()
+
+    async def _recycle(self, slot: PoolSlot) -> PoolSlot:
+        if slot.context is not None:
+            logger.debug(f"closing browser context after {slot.renders} renders")
+            try:
+                await slot.context.close()
+            except Exception as e:
+                logger.warning(f"failed to close browser context: {e}")
+        return PoolSlot()
+
+    def _policy(self, target: TargetConfig) -> ResourcePolicy:
+        if target.id not in self._policies:
+            resource_types = self._cfg.block_resources if target.block_resources is None else target.block_resources
+            self._policies[target.id] = ResourcePolicy(
+                resource_types=frozenset(resource_types),
+                domains=tuple(self._cfg.block_domains + target.block_domains),
+            )
+        return self._policies[target.id]
+
+    async def _settle(self, page: Page, target: TargetConfig) -> None:
+        """Wait until the text of the target appears, or until the network is idle, but no longer than the cap"""
+        try:
+            if target.text_selector:
+                await page.wait_for_selector(
+                    target.text_selector, state="attached", timeout=self._cfg.settle_timeout * 1000
+                )
+            else:
+                await page.wait_for_load_state("networkidle", timeout=self._cfg.settle_timeout * 1000)
+        except PlaywrightTimeoutError:
+            logger.debug(f"page {page.url} has not settled, taking content as is")
+
+    async def render(self, url: str, target: TargetConfig) -> str:
+        """Render page and return its content.
+
+        Raises:
+            TimeoutError: if page was not rendered within `timeout` seconds
+        """
+        slot = await self._slots.get()
+        try:
+            if slot.context is None:
+                slot.context = await self._browser.new_context(user_agent=self._user_agent)
+            page = await slot.context.new_page()
+            policy = self._policy(target)
+
+            async def route(route: Route):
+                if policy.blocks(route.request.resource_type, route.request.url):
+                    await route.abort()
+                else:
+                    await route.fallback()
+
+            try:
+                await page.route("**/*", route)
+                async with asyncio.timeout(self._cfg.timeout):
+                    await page.goto(url, wait_until="domcontentloaded", timeout=self._cfg.timeout * 1000)
+                    await self._settle(page, target)
+                    return await page.content()
+            finally:
+                await page.close()
+        finally:
+            slot.renders += 1
+            if slot.renders >= self._cfg.recycle_after:
+                slot = await self._recycle(slot)
+            self._slots.put_nowait(slot)
@@ -0,0 +1,214 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+
+from debias.core.configs import TargetConfig
+from debias.renderer.config import BrowserConfig
+from debias.renderer.renderer import Renderer
+
+logger = logging.getLogger(__name__)
+
+
+class RenderError(Exception):
+    """Raised when a worker failed to render a page or crashed while rendering it"""
+
+
+@dataclass
+class WorkerStats:
+    renders: int = 0
+    failures: int = 0
+    restarts: int = 0
+    render_seconds: float = 0.0
+    crashes_in_row: int = 0
+
+    def __str__(self) -> str:
+        average = self.render_seconds / self.renders if self.renders else 0.0
+        return f"renders={self.renders} failures={self.failures} restarts={self.restarts} avg_render={average:.2f}s"
+
+
+@dataclass
+class WorkerHandle:
+    index: int
+    process: multiprocessing.process.BaseProcess
+    conn: Connection
+    alive: bool = True
+    pending: dict[int, tuple[asyncio.Future[str], float]] = field(default_factory=dict)
+
+
+def worker_main(index: int, config: BrowserConfig, user_agent: str | None, conn: Connection):
+    """Entrypoint of a browser worker process"""
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(index, config, user_agent, conn))
+
+
+async def _serve(index: int, config: BrowserConfig, user_agent: str | None, conn: Connection):
+    renderer = Renderer(config, user_agent)
+    await renderer.init()
+    logger.info(f"render worker {index} started")
+
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    tasks: set[asyncio.Task] = set()
+
+    async def render(job_id: int, url: str, target: dict):
+        try:
+            content = await renderer.render(url, TargetConfig.model_validate(target))
+            conn.send((job_id, True, content))
+        except Exception as e:
+            conn.send((job_id, False, f"{type(e).__name__}: {e}"))
+            if not renderer.is_connected and not stopped.done():
+                logger.error(f"render worker {index}: browser disconnected")
+                stopped.set_result(None)
+
+    def on_readable():
+        try:
+            while conn.poll():
+                task = loop.create_task(render(*conn.recv()))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (EOFError, OSError):
+            if not stopped.done():
+                stopped.set_result(None)  # supervisor is gone
+
+    loop.add_reader(conn.fileno(), on_readable)
+    await stopped
+    loop.remove_reader(conn.fileno())
+    for task in tasks:
+        task.cancel()
+    await renderer.close()
+    logger.info(f"render worker {index} stopped")
+
+
+class RenderSupervisor:
+    """Shards rendering across `workers` processes, each running its own Playwright and browser pool.
+
+    Jobs go to the worker with the fewest pending renders. A worker that dies fails its pending jobs
+    with RenderError and is restarted. Per-worker stats are logged every `stats_interval` seconds.
+    """
+
+    def __init__(self, config: BrowserConfig, user_agent: str | None = None):
+        self._cfg = config
+        self._user_agent = user_agent
+        self._mp = multiprocessing.get_context("spawn")
+        self._workers: list[WorkerHandle] = []
+        self._stats: list[WorkerStats] = [WorkerStats() for _ in range(config.workers)]
+        self._job_ids = itertools.count()
+        self._closing = False
+        self._stats_task: asyncio.Task | None = None
+
+    async def init(self):
+        self._workers = [self._start(index) for index in range(self._cfg.workers)]
+        self._stats_task = asyncio.create_task(self._log_stats())
+
+    async def close(self):
+        self._closing = True
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            if worker.alive:
+                worker.alive = False
+                loop.remove_reader(worker.conn.fileno())
+                worker.conn.close()  # worker stops when its pipe is closed
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, self._cfg.timeout)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self._log_stats_once()
+
+    def _start(self, index: int) -> WorkerHandle:
+        parent_conn, child_conn = self._mp.Pipe()
+        process = self._mp.Process(
+            target=worker_main,
+            args=(index, self._cfg, self._user_agent, child_conn),
+            name=f"render-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+
+        worker = WorkerHandle(index=index, process=process, conn=parent_conn)
+        asyncio.get_running_loop().add_reader(parent_conn.fileno(), self._on_readable, worker)
+        logger.info(f"started render worker {index} (pid {process.pid})")
+        return worker
+
+    def _restart(self, index: int):
+        if not self._closing:
+            self._workers[index] = self._start(index)
+
+    def _on_readable(self, worker: WorkerHandle):
+        try:
+            while worker.conn.poll():
+                job_id, ok, payload = worker.conn.recv()
+                future, started_at = worker.pending.pop(job_id)
+                stats = self._stats[worker.index]
+                if ok:
+                    stats.renders += 1
+                    stats.crashes_in_row = 0
+                    stats.render_seconds += time.monotonic() - started_at
+                else:
+                    stats.failures += 1
+                if future.done():
+                    # caller was cancelled, e.g. by a timeout, while the page was rendered
+                    continue
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RenderError(payload))
+        except (EOFError, OSError):
+            self._on_crash(worker)
+
+    def _on_crash(self, worker: WorkerHandle):
+        if not worker.alive:
+            return
+        worker.alive = False
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(worker.conn.fileno())
+        worker.conn.close()
+        for future, _ in worker.pending.values():
+            if not future.done():
+                future.set_exception(RenderError(f"render worker {worker.index} crashed"))
+        self._stats[worker.index].failures += len(worker.pending)
+        worker.pending.clear()
+        if self._closing:
+            return
+
+        stats = self._stats[worker.index]
+        stats.restarts += 1
+        stats.crashes_in_row += 1
+        # back off, so a browser which can not start does not spin
+        delay = min(2 ** (stats.crashes_in_row - 1), 60)
+        logger.error(f"render worker {worker.index} exited, restarting in {delay}s")
+        loop.call_later(delay, self._restart, worker.index)
+
+    async def render(self, url: str, target: TargetConfig) -> str:
+        """Render page in the least loaded worker and return its content.
+
+        Raises:
+            RenderError: if page was not rendered or worker crashed
+        """
+        workers = [worker for worker in self._workers if worker.alive]
+        if not workers:
+            raise RenderError("no render workers available")
+        worker = min(workers, key=lambda w: len(w.pending))
+        job_id = next(self._job_ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[job_id] = (future, time.monotonic())
+        try:
+            worker.conn.send((job_id, url, target.model_dump(mode="json")))
+        except OSError:
+            self._on_crash(worker)
+        return await future
+
+    def _log_stats_once(self):
+        for index, stats in enumerate(self._stats):
+            logger.info(f"render worker {index}: {stats}")
+
+    async def _log_stats(self):
+        while True:
+            await asyncio.sleep(self._cfg.stats_interval)
+            self._log_stats_once()
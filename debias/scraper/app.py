@@ -2,18 +2,24 @@ import asyncio
 from collections import defaultdict
 from datetime import datetime
 
-import httpx
 import redis.asyncio as aioredis
 from core.parser import Parser
 from faststream import ContextRepo, FastStream, Logger
 from faststream.exceptions import AckMessage, NackMessage, RejectMessage
 from faststream.nats import NatsBroker, NatsMessage
 
+from debias.core.dedup import Deduplicator
+from debias.core.documents import Document
 from debias.core.metastore import Metadata, Metastore
 from debias.core.models import FetchRequest, ProcessRequest, RenderRequest
-from debias.core.parser import absolute_url, extract_domain, hashsum, normalize_url
+from debias.core.parser import extract_domain, hashsum, normalize_url
+from debias.core.postgres import create_pool
 from debias.core.s3 import S3Client
+from debias.core.storage import PageStore, page_key
 from debias.scraper.config import Config
+from debias.scraper.decisions import RenderDecisions
+from debias.scraper.scheduler import FetchScheduler, SchedulerTimeout
+from debias.scraper.validators import ValidatorStore
 
 broker = NatsBroker(pedantic=True)
 app = FastStream(broker)
@@ -31,9 +37,15 @@ class DI:
         # type: ignore
         cls.config = Config()  # type: ignore
         cls.keyvalue = aioredis.Redis.from_url(cls.config.keyvalue.dsn)
-        cls.http = httpx.AsyncClient(headers={"User-Agent": cls.config.http.user_agent})
+        cls.seen = Deduplicator(cls.keyvalue, "scrape:url_hash", cls.config.dedup)
+        cls.scheduler = FetchScheduler(cls.config.scheduler, cls.config.http)
+        cls.validators = ValidatorStore(cls.keyvalue)
+        cls.decisions = RenderDecisions(cls.config.decisions)
         cls.s3 = S3Client(cls.config.s3)
-        cls.metastore = Metastore(cls.config.pg.connection)
+        cls.pages = PageStore(cls.s3, cls.config.storage)
+        # one pool shared by all stores, each handler runs its transaction on its own connection
+        cls.pg = create_pool(cls.config.pg)
+        cls.metastore = Metastore(cls.pg)
         cls.parsers: dict[str, Parser | None] = defaultdict(lambda: None)
 
         cls.fetch_queue_publisher = broker.publisher(subject="fetch-queue", stream="debias")
@@ -50,11 +62,20 @@ async def app_on_startup(context: ContextRepo, config: str):
     DI.init(config)
 
     context.set_global("config", DI.config)
-    await DI.http.__aenter__()
+    # opened before the broker is connected, as handlers may run before after_startup
+    await DI.pg.open(wait=True)
+    await DI.s3.open()
+    await DI.scheduler.init()
 
     for target_config in DI.config.app.targets:
-        parser = Parser(target_config)
+        parser = Parser(target_config, DI.config.app.html_backend)
         DI.parsers[parser.domain] = parser
+        DI.scheduler.register(parser.domain, target_config.rate_limit)
+
+    # subscriber is registered here, as number of concurrent handlers is known only after config is loaded
+    broker.subscriber(subject="fetch-queue", stream="debias", max_workers=DI.config.scheduler.concurrency)(
+        broker_stream_subscriber
+    )
 
     await broker.connect(DI.config.nats.dsn.encoded_string())
 
@@ -74,10 +95,11 @@ async def app_on_shutdown(context: ContextRepo):
     """Lifespan hook that is called when application is shutting down
     after it stops accepting any request or declaring queues
     """
-    await DI.http.__aexit__(None, None, None)
+    await DI.scheduler.close()
+    await DI.s3.close()
+    await DI.pg.close()
 
 
-@broker.subscriber(subject="fetch-queue", stream="debias")
 async def broker_stream_subscriber(msg: NatsMessage, data: FetchRequest, logger: Logger, context: ContextRepo):
     """Handler which process each message from the queue.
     It subscribes to subject "fetch-queue", so all messages published exactly to "fetch-queue" subject
@@ -85,6 +107,7 @@ async def broker_stream_subscriber(msg: NatsMessage, data: FetchRequest, logger:
     It subscribes to stream "debias" with retention policy "work_queue".
     This allows multiple subscribers to connect to the same stream and receive unqiue messages
     i.e. each message is received only once by only one subscriber).
+    Up to `scheduler.concurrency` messages are handled concurrently, fetches are limited per domain.
 
     Read more about JetStream & Pulling Consumer here:
     - https://docs.nats.io/nats-concepts/jetstream
@@ -101,15 +124,24 @@ async def broker_stream_subscriber(msg: NatsMessage, data: FetchRequest, logger:
 
     logger.debug(f"checking if url {url} was scraped in last 12 hours")
     url_hash = hashsum(url)
-    key = f"scrape:url_hash:{url_hash}"
-    if (await DI.keyvalue.get(key)) is not None:
+    if not await DI.seen.claim(url_hash):  # expires in 12 hours
         logger.warning(f"skipping url {url}: url_hash {url_hash} is present")
         raise RejectMessage()  # refuse to process
     logger.debug(f"url hash {url_hash} is not present, processing url")
-    await DI.keyvalue.set(key, "1", ex=60 * 60 * 12)  # expires in 12 hours
+
+    previous_content_hash, conditional_headers = await DI.validators.load(url_hash)
 
     logger.debug(f"retrieving url {url}")
-    response = await DI.http.get(url)
+    try:
+        response = await DI.scheduler.get(url, headers=conditional_headers)
+    except SchedulerTimeout:
+        logger.warning(f"failed to schedule {url}: domain is busy")
+        await DI.seen.release(url_hash)  # allow to retry
+        raise NackMessage(delay=DI.config.scheduler.acquire_timeout) from None  # retry later
+    if response.status_code == 304:  # not modified, body is not transferred
+        logger.warning(f"skipping url {url}: not modified since last scrape")
+        await DI.validators.touch(url_hash)
+        raise AckMessage()  # ok, no retry needed
     if response.status_code // 100 != 2:  # not 2XX code
         logger.warning(f"failed to retrieve {url}: status code {response.status_code}")
         raise NackMessage()  # failed, retry later
@@ -118,29 +150,52 @@ async def broker_stream_subscriber(msg: NatsMessage, data: FetchRequest, logger:
     logger.debug(f"checking content hash for url {url}")
     content = response.text
     content_hash = hashsum(content)
-    if (await DI.keyvalue.get(f"content_hash:{url_hash}")) == content_hash:
+    await DI.validators.save(url_hash, content_hash, response)  # expires in 30 days
+    if previous_content_hash == content_hash:
         logger.warning(f"skipping url {url}: content_hash {content_hash} has not changed")
         raise AckMessage()  # ok, no retry needed
-    await DI.keyvalue.set(f"content_hash:{url_hash}", content_hash, ex=60 * 60 * 24 * 30)  # expires in 30 days
     logger.debug(f"content hash {content_hash} is not present, processing content")
 
-    filepath = f"{parser.config.id}/{url_hash}/{content_hash}.html"
+    filepath = page_key(parser.config.id, content_hash)
 
+    await dispatch(logger, parser, url, url_hash, content, content_hash, filepath)
+    raise AckMessage()
+
+
+async def dispatch(
+    logger: Logger,
+    parser: Parser,
+    url: str,
+    url_hash: str,
+    content: str,
+    content_hash: str,
+    filepath: str,
+):
+    """Finish fetched page or send it to the renderer depending on the target render mode"""
     if parser.need_render == "never":
         await finish(logger, parser, url, url_hash, content, content_hash, filepath)
-        raise AckMessage()
+        return
 
     if parser.need_render == "always":
         await render(logger, parser, url)
-        raise AckMessage()
+        return
 
     if parser.need_render == "auto":
-        text = parser.extract_text(content, logger)
-        if len(text) < 300:
+        document = None
+        need_render = DI.decisions.predict(parser.config.id, url)
+        if need_render is None:
+            document = parser.parse(content)
+            text = parser.extract_text(document, logger)
+            need_render = len(text) < DI.config.decisions.min_text_length
+            DI.decisions.record(parser.config.id, url, need_render)
+        else:
+            logger.debug(f"predicted render decision for url {url}: {need_render}")
+
+        if need_render:
             await render(logger, parser, url)
         else:
-            await finish(logger, parser, url, url_hash, content, content_hash, filepath)
-        raise AckMessage()
+            await finish(logger, parser, url, url_hash, content, content_hash, filepath, document)
+        return
 
     raise NackMessage()  # didnt hit any path
 
@@ -153,10 +208,11 @@ async def finish(
     content: str,
     content_hash: str,
     filepath: str,
+    document: Document | None = None,
 ):
     try:
         async with DI.metastore.with_transaction():
-            await DI.s3.upload(filepath, content)
+            compressed_size = await DI.pages.upload(filepath, parser.config.id, content)
 
             metadata_id = await DI.metastore.save(
                 Metadata(
@@ -168,6 +224,7 @@ async def finish(
                     url_hash=url_hash,
                     content_hash=content_hash,
                     content_size=len(content),
+                    compressed_size=compressed_size,
                 )
             )
 
@@ -185,8 +242,10 @@ async def finish(
         raise NackMessage() from e
 
     try:
-        next_urls = parser.extract_hrefs(content, logger)
-        urls = [normalize_url(absolute_url(extract_domain(url), next_url)) for next_url in next_urls]
+        next_urls = parser.extract_links(document or content, url, logger)
+        seen = await DI.seen.seen_many([hashsum(next_url) for next_url in next_urls])
+        urls = [next_url for next_url, is_seen in zip(next_urls, seen, strict=True) if not is_seen]
+        logger.debug(f"spawning {len(urls)} fetch requests, {len(next_urls) - len(urls)} links were seen recently")
         await asyncio.gather(*[DI.fetch_queue_publisher.publish(FetchRequest(url=next_url)) for next_url in urls])
     except Exception as e:
         logger.warning(f"failed to spawn new fetch requests: {e}")
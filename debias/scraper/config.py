@@ -1,7 +1,8 @@
 import importlib.metadata
 from typing import ClassVar, override
 
-from core.configs import HttpConfig, NatsConfig, PostgresConfig, S3Config, TargetConfig
+from core.configs import DedupConfig, HttpConfig, NatsConfig, PostgresConfig, S3Config, StorageConfig, TargetConfig
+from core.documents import HtmlBackend
 from pydantic import BaseModel, Field
 from pydantic_settings import (
     BaseSettings,
@@ -13,19 +14,50 @@ from pydantic_settings import (
 
 class AppConfig(BaseModel):
     targets: list[TargetConfig] = Field(default_factory=list, description="Targets configuration")
+    html_backend: HtmlBackend = Field(default="selectolax", description="HTML parser used to extract text and links")
 
 
 class KeyValueConfig(BaseModel):
     dsn: str = Field(description="Redis DSN")
 
 
+class SchedulerConfig(BaseModel):
+    concurrency: int = Field(default=16, description="Maximum number of fetches in flight per process")
+    domain_concurrency: int = Field(default=2, description="Maximum number of fetches in flight per domain")
+    domain_rate: float = Field(default=1.0, description="Default number of requests per second per domain")
+    domain_burst: int = Field(default=4, description="Number of requests per domain allowed at once")
+    acquire_timeout: float = Field(
+        default=30.0,
+        description="Seconds to wait for a domain slot before the message is returned to the queue",
+    )
+    request_timeout: float = Field(default=30.0, description="HTTP request timeout in seconds")
+    keepalive_expiry: float = Field(default=60.0, description="Seconds to keep idle connections open")
+    http2: bool = Field(default=True, description="Whether to use HTTP/2 when server supports it")
+
+
+class DecisionConfig(BaseModel):
+    enabled: bool = Field(default=True, description="Whether to learn render decisions of targets with render = 'auto'")
+    min_text_length: int = Field(default=300, description="Pages with shorter text under text_selector are rendered")
+    min_samples: int = Field(default=20, description="Number of probed pages before decisions are predicted")
+    confidence: float = Field(default=0.95, description="Share of probed pages which must agree on a decision")
+    probe_every: int = Field(default=50, description="Re-probe every n-th page even if decision is known")
+    window: int = Field(default=200, description="Number of observations after which old ones are aged")
+    max_patterns: int = Field(
+        default=10_000, description="Number of url path patterns with stats kept, least recently used are forgotten"
+    )
+
+
 class Config(BaseSettings):
     nats: NatsConfig = Field(default_factory=NatsConfig, description="NATS configuration")
     http: HttpConfig = Field(default_factory=HttpConfig, description="HTTP configuration")
     app: AppConfig = Field(default_factory=AppConfig, description="Application configuration")
     s3: S3Config = Field(description="S3 configuration")
+    storage: StorageConfig = Field(default_factory=StorageConfig, description="Compression of stored pages")
     pg: PostgresConfig = Field(description="PostgreSQL configuration")
     keyvalue: KeyValueConfig = Field(description="Key-Value configuration")
+    dedup: DedupConfig = Field(default_factory=DedupConfig, description="Seen urls deduplication configuration")
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig, description="Fetch scheduler configuration")
+    decisions: DecisionConfig = Field(default_factory=DecisionConfig, description="Render decisions configuration")
 
     @property
     def version(self) -> str:
@@ -0,0 +1,79 @@
+import re
+import urllib.parse as urllib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from debias.scraper.config import DecisionConfig
+
+ID_PATTERN = re.compile(r"\d")
+
+
+@dataclass
+class DecisionStats:
+    static: int = 0
+    render: int = 0
+    since_probe: int = 0
+
+
+def path_pattern(url: str) -> str:
+    """Generalize url path to its first segment and depth, e.g. /world/2025/05/some-title -> /world/*/*/*"""
+    segments = [segment for segment in urllib.urlsplit(url).path.split("/") if segment]
+    if not segments:
+        return "/"
+    head = "*" if ID_PATTERN.search(segments[0]) else segments[0]
+    return "/" + "/".join([head] + ["*"] * (len(segments) - 1))
+
+
+class RenderDecisions:
+    """Learns whether pages of a target need rendering, per target and url path pattern.
+
+    Once enough pages of a pattern agree, the decision is predicted without extracting text.
+    Every `probe_every`-th page of a pattern is still probed, so the stats follow site changes.
+    Stats of at most `max_patterns` patterns are kept, the least recently used are forgotten.
+    """
+
+    def __init__(self, config: DecisionConfig):
+        self._cfg = config
+        self._stats: OrderedDict[tuple[str, str], DecisionStats] = OrderedDict()
+
+    def _get(self, key: tuple[str, str]) -> DecisionStats | None:
+        if (stats := self._stats.get(key)) is not None:
+            self._stats.move_to_end(key)
+        return stats
+
+    def predict(self, target_id: str, url: str) -> bool | None:
+        """Returns whether page needs rendering, or None if the page has to be probed"""
+        if not self._cfg.enabled:
+            return None
+
+        stats = self._get((target_id, path_pattern(url)))
+        if stats is None:
+            return None
+        total = stats.static + stats.render
+        if total < self._cfg.min_samples or stats.since_probe >= self._cfg.probe_every:
+            return None
+
+        if stats.render >= total * self._cfg.confidence:
+            stats.since_probe += 1
+            return True
+        if stats.static >= total * self._cfg.confidence:
+            stats.since_probe += 1
+            return False
+        return None
+
+    def record(self, target_id: str, url: str, need_render: bool) -> None:
+        key = (target_id, path_pattern(url))
+        if (stats := self._get(key)) is None:
+            stats = self._stats[key] = DecisionStats()
+            if len(self._stats) > self._cfg.max_patterns:
+                self._stats.popitem(last=False)
+        if need_render:
+            stats.render += 1
+        else:
+            stats.static += 1
+        stats.since_probe = 0
+
+        if stats.static + stats.render > self._cfg.window:
+            # age old observations, so recent pages outweigh them
+            stats.static //= 2
+            stats.render //= 2
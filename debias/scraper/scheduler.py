@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+import httpx
+
+from debias.core.configs import HttpConfig
+from debias.core.parser import extract_domain
+from debias.scraper.config import SchedulerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a fetch could not be scheduled in time"""
+
+
+class TokenBucket:
+    """Token bucket which allows `burst` requests at once and refills with `rate` tokens per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        # lock makes waiters queue up in order, so a domain is never hit faster than its rate
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class DomainLimiter:
+    """Politeness limits of a single domain: concurrent requests and request rate"""
+
+    def __init__(self, concurrency: int, rate: float, burst: int):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(rate, burst)
+
+    async def acquire(self) -> None:
+        await self._semaphore.acquire()
+        try:
+            await self._bucket.acquire()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+
+class FetchScheduler:
+    """Schedules HTTP fetches of the scraper.
+
+    It keeps at most `concurrency` requests in flight per process, applies per-domain
+    concurrency and rate limits (token bucket), and reuses pooled HTTP/2 keep-alive connections.
+    Waiting for a slow domain never occupies a global slot, so one slow site does not stall the others.
+    """
+
+    def __init__(self, config: SchedulerConfig, http: HttpConfig):
+        self._cfg = config
+        self._in_flight = asyncio.Semaphore(config.concurrency)
+        self._limiters: dict[str, DomainLimiter] = defaultdict(
+            lambda: DomainLimiter(config.domain_concurrency, config.domain_rate, config.domain_burst)
+        )
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": http.user_agent},
+            http2=config.http2,
+            timeout=httpx.Timeout(config.request_timeout),
+            limits=httpx.Limits(
+                max_connections=config.concurrency,
+                max_keepalive_connections=config.concurrency,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+        )
+
+    def register(self, domain: str, rate: float | None = None) -> None:
+        """Register domain with its own rate limit, otherwise default limits are used"""
+        self._limiters[domain] = DomainLimiter(
+            self._cfg.domain_concurrency,
+            rate or self._cfg.domain_rate,
+            self._cfg.domain_burst,
+        )
+        logger.debug(f"registered domain {domain} in scheduler")
+
+    async def init(self):
+        await self._client.__aenter__()
+
+    async def close(self):
+        await self._client.__aexit__(None, None, None)
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+        """Fetch url respecting domain limits.
+
+        Raises:
+            SchedulerTimeout: if domain slot was not acquired within `acquire_timeout` seconds
+        """
+        limiter = self._limiters[extract_domain(url)]
+        try:
+            async with asyncio.timeout(self._cfg.acquire_timeout):
+                await limiter.acquire()
+        except TimeoutError as e:
+            raise SchedulerTimeout(f"domain of {url} is busy") from e
+
+        try:
+            async with self._in_flight:
+                return await self._client.get(url, headers=headers)
+        finally:
+            limiter.release()
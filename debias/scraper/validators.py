@@ -0,0 +1,55 @@
+import httpx
+import redis.asyncio as aioredis
+
+CONTENT_TTL = 60 * 60 * 24 * 30  # 30 days
+
+
+class ValidatorStore:
+    """Stores content hash and HTTP cache validators (ETag, Last-Modified) of fetched urls.
+
+    Validators are kept in hash `validators:{url_hash}` next to `content_hash:{url_hash}`
+    and are turned into `If-None-Match` / `If-Modified-Since` headers of the next request.
+    """
+
+    def __init__(self, keyvalue: aioredis.Redis):
+        self._keyvalue = keyvalue
+
+    async def load(self, url_hash: str) -> tuple[str | None, dict[str, str]]:
+        """Returns last content hash of the url and conditional request headers"""
+        async with self._keyvalue.pipeline(transaction=False) as pipe:
+            pipe.get(f"content_hash:{url_hash}")
+            pipe.hgetall(f"validators:{url_hash}")
+            content_hash, validators = await pipe.execute()
+
+        if content_hash is None:
+            # without a known content there is nothing to validate against
+            return None, {}
+
+        headers = {}
+        if etag := validators.get(b"etag"):
+            headers["If-None-Match"] = etag.decode()
+        if last_modified := validators.get(b"last_modified"):
+            headers["If-Modified-Since"] = last_modified.decode()
+        return content_hash.decode(), headers
+
+    async def save(self, url_hash: str, content_hash: str, response: httpx.Response) -> None:
+        validators = {}
+        if etag := response.headers.get("ETag"):
+            validators["etag"] = etag
+        if last_modified := response.headers.get("Last-Modified"):
+            validators["last_modified"] = last_modified
+
+        async with self._keyvalue.pipeline(transaction=True) as pipe:
+            pipe.set(f"content_hash:{url_hash}", content_hash, ex=CONTENT_TTL)
+            pipe.delete(f"validators:{url_hash}")
+            if validators:
+                pipe.hset(f"validators:{url_hash}", mapping=validators)
+                pipe.expire(f"validators:{url_hash}", CONTENT_TTL)
+            await pipe.execute()
+
+    async def touch(self, url_hash: str) -> None:
+        """Extends lifetime of content hash and validators of unchanged url"""
+        async with self._keyvalue.pipeline(transaction=False) as pipe:
+            pipe.expire(f"content_hash:{url_hash}", CONTENT_TTL)
+            pipe.expire(f"validators:{url_hash}", CONTENT_TTL)
+            await pipe.execute()
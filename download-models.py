@@ -4,7 +4,7 @@ os.environ["HF_HOME"] = "./models/cache"
 
 import spacy
 import spacy.cli
-from transformers import pipeline
+from transformers import AutoModel, AutoTokenizer, pipeline
 
 spacy_model = "en_core_web_lg"
 
@@ -20,3 +20,17 @@ finally:
 tf_model = "facebook/bart-large-mnli"
 
 pipeline("zero-shot-classification", model=tf_model)
+
+onnx_model = "./models/bart-large-mnli-int8"
+
+if not os.path.exists(onnx_model):
+    from debias.processor.nlp.classifier import export_onnx
+
+    export_onnx(tf_model, onnx_model)
+print("onnx model is ready")
+
+embedding_model = "sentence-transformers/all-MiniLM-L6-v2"
+
+AutoTokenizer.from_pretrained(embedding_model)
+AutoModel.from_pretrained(embedding_model)
+print("embedding model is ready")
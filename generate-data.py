@@ -1,198 +1,40 @@
+"""Populate the database with random documents and benchmark write paths of Wordstore.
+
+Set BENCHMARK=1 to save NUM_DOCUMENTS documents with each write path and compare them:
+row by row (previous implementation), `save` of one document, and `save_many` of BATCH_SIZE documents.
+
+POSTGRES_CONNECTION="postgresql://..." BENCHMARK=1 uv run generate-data.py
+"""
+
 import asyncio
 import hashlib
 import logging
 import os
 import random
 import string
-from contextlib import asynccontextmanager
-from dataclasses import dataclass
+import time
 from datetime import datetime, timedelta
 
-import psycopg
 import psycopg.sql
 
+from debias.core.configs import PostgresConfig
+from debias.core.postgres import create_pool
+from debias.core.wordstore import Keyword, ProcessingResult, Topic, Wordstore
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class Keyword:
-    text: str
-    type: str
-
-
-@dataclass
-class Topic:
-    text: str
-    type: str
-
-
-@dataclass
-class ProcessingResult:
-    absolute_url: str
-    url_hash: str
-    target_id: str
-    scrape_datetime: datetime
-    article_datetime: datetime
-    snippet: str
-    title: str
-    keywords: list[Keyword]
-    topics: list[Topic]
-
-
-@dataclass
-class Target:
-    id: str
-    main_page: str
-    country: str
-    alignment: str
-
-
-class Wordstore:
-    def __init__(self, connection: str):
-        self._conn_str = connection
-        self._connection: psycopg.AsyncConnection | None = None
-
-    async def _get_connection(self) -> psycopg.AsyncConnection:
-        if self._connection is None or self._connection.closed:
-            self._connection = await psycopg.AsyncConnection.connect(self._conn_str)
-        logger.debug(f"connected to {self._connection.info}")
-        return self._connection
-
-    async def init(self):
-        logger.info("initializing wordstore")
-
-        conn = await self._get_connection()
-        async with conn.cursor() as cursor:
-            logger.info("creating table targets")
-            await cursor.execute("""
-                create table if not exists public.targets (
-                    id text not null primary key,
-                    name text not null,
-                    main_page text not null,
-                    country text not null,
-                    alignment text not null
-                );
-            """)
-            logger.info("inserting into table targets")
-            await cursor.execute("""
-                insert into public.targets (id, name, main_page, country, alignment) values
-                    ('SKY','Sky News','https://news.sky.com/','UK','Lean Left'),
-                    ('GBN','GBN','https://www.gbnews.com/','UK','Lean Right'),
-                    ('ABC','ABC News','http://abcnews.go.com/','USA','Lean Left'),
-                    ('DMU','Daily Mail','https://www.dailymail.co.uk/home/index.html','UK','Right'),
-                    ('TIM','The Times','https://www.thetimes.com/','UK','Center'),
-                    ('MIR','The Mirror','https://www.mirror.co.uk/','UK','Left'),
-                    ('MET','Metro','https://metro.co.uk/','UK','Lean Left'),
-                    ('STD','The Standard','https://www.standard.co.uk/','UK','Center'),
-                    ('WAL','Wales Online','https://www.walesonline.co.uk/','UK','Lean Left'),
-                    ('SUN','The Sun','https://www.thesun.co.uk/','UK','Center'),
-                    ('GRD','The Guardian','https://www.theguardian.com/uk-news','UK','Left'),
-                    ('BBC','BBC News','http://www.bbc.com/','UK','Center'),
-                    ('BLB','Bloomberg','http://www.bloomberg.com/','USA','Lean Left'),
-                    ('BUS','Business Insider','https://www.insider.com/','USA','Lean Left'),
-                    ('BFN','BuzzFeed News','https://www.buzzfeednews.com','USA','Left'),
-                    ('CBS','CBS News','https://www.cbsnews.com','USA','Lean Left'),
-                    ('CNN','CNN Digital','https://cnn.com','USA','Lean Left'),
-                    ('FRB','Forbes','https://www.forbes.com','USA','Center'),
-                    ('FND','Fox News Digital','http://www.foxnews.com/','USA','Right'),
-                    ('NRN','National Review','https://www.nationalreview.com/news/','USA','Lean Right'),
-                    ('NBC','NBC News Digital','https://www.nbcnews.com','USA','Lean Left'),
-                    ('NYP','New York Post (News)','https://nypost.com','USA','Lean Right'),
-                    ('NYT','New York Times (News)','https://www.nytimes.com','USA','Lean Left'),
-                    ('NNN','NewsNation','https://www.newsnationnow.com','USA','Center'),
-                    ('SPC','The American Spectator','https://spectator.org','USA','Right'),
-                    ('ATL','The Atlantic','https://www.theatlantic.com/world/','USA','Left'),
-                    ('DWN','The Daily Wire','https://www.dailywire.com','USA','Right'),
-                    ('ECO','The Economist','https://www.economist.com','USA','Lean Left'),
-                    ('FED','The Federalist','https://thefederalist.com','USA','Right'),
-                    ('NYK','The New Yorker','https://www.newyorker.com','USA','Left'),
-                    ('TIM','Time Magazine','https://time.com','USA','Lean Left'),
-                    ('UTN','USA TODAY','https://www.usatoday.com','USA','Lean Left'),
-                    ('VOX','Vox','https://www.vox.com','USA','Left'),
-                    ('WSJ','Wall Street Journal (News)','https://www.wsj.com','USA','Center'),
-                    ('WEN','Washington Examiner','https://washingtonexaminer.com','USA','Lean Right'),
-                    ('WFB','Washington Free Beacon','https://freebeacon.com','USA','Right'),
-                    ('WPN','Washington Post','https://www.washingtonpost.com','USA','Lean Left'),
-                    ('WTN','Washington Times','https://www.washingtontimes.com','USA','Lean Right')
-                on conflict (id) do nothing;
-            """)
-            logger.info("creating table documents")
-            await cursor.execute("""
-                create table if not exists public.documents (
-                    id serial primary key,
-                    title text not null,
-                    absolute_url text not null,
-                    url_hash text not null,
-                    target_id text not null references targets(id),
-                    scrape_datetime timestamp not null,
-                    article_datetime timestamp,
-                    snippet text not null
-                );               
-            """)
-            logger.info("creating table keywords")
-            await cursor.execute("""
-                create table if not exists public.keywords (
-                    id serial primary key,
-                    type text not null,
-                    keyword text not null,
-                    count int not null
-                );
-            """)
-            await cursor.execute("""
-                create unique index if not exists keywords_type_keyword
-                    on keywords(type, keyword);
-            """)
-            logger.info("creating table topics")
-            await cursor.execute("""
-                create table if not exists public.topics (
-                    id serial primary key,
-                    type text not null,
-                    topic text not null,
-                    count int not null
-                );
-            """)
-            await cursor.execute(
-                """
-                create unique index if not exists topics_type_topic
-                    on topics(type, topic);
-            """
-            )
-            logger.info("creating table keyword_appearances")
-            await cursor.execute("""
-                create table if not exists public.keyword_appearances (
-                    keyword_id int references keywords(id),
-                    document_id int references documents(id),
-                    count int,
-                    primary key (keyword_id, document_id)
-                );
-            """)
-            logger.info("creating table topic_appearances")
-            await cursor.execute("""
-                create table if not exists public.topic_appearances (
-                    topic_id int references topics(id),
-                    document_id int references documents(id),
-                    count int,
-                    primary key (topic_id, document_id)
-                );
-            """)
-        await conn.commit()
-
-    @asynccontextmanager
-    async def with_transaction(self):
-        async with (await self._get_connection()).transaction() as t:
-            try:
-                yield t
-            except Exception as e:
-                logger.error(f"transaction failed: {e}")
-                raise e from e
-            else:
-                logger.debug("committing transaction")
+class RowByRowWordstore(Wordstore):
+    """Previous write path with a statement per document, keyword, topic and appearance, kept as benchmark baseline"""
+
+    async def save_many(self, results: list[ProcessingResult]):
+        for result in results:
+            await self.save_rows(result)
 
-    async def save(self, result: ProcessingResult):
-        conn = await self._get_connection()
-        async with self.with_transaction():
-            async with conn.cursor() as c:
+    async def save_rows(self, result: ProcessingResult):
+        async with self.with_transaction() as t:
+            async with t.connection.cursor() as c:
                 insert_document = psycopg.sql.SQL("""
                     insert into public.documents (
                         title, absolute_url, url_hash, target_id, scrape_datetime, article_datetime, snippet
@@ -216,20 +58,18 @@ class Wordstore:
                     raise ValueError(f"failed to insert document <{result.absolute_url}>")
                 document_id = r[0]
 
-                # create new keywords if not exists, update count if exists
                 insert_keywords = psycopg.sql.SQL("""
                     insert into public.keywords (type, keyword, count) values (%s, %s, 1)
                     on conflict (type, keyword) do update set count = keywords.count + 1
                     returning id;
                 """)
                 keyword_ids = []
-                for keyword_id in result.keywords:
-                    r = await (await c.execute(insert_keywords, (keyword_id.type, keyword_id.text))).fetchone()
+                for keyword in result.keywords:
+                    r = await (await c.execute(insert_keywords, (keyword.type, keyword.text))).fetchone()
                     if r is None:
-                        raise ValueError(f"failed to insert keyword <{keyword_id.text}>")
+                        raise ValueError(f"failed to insert keyword <{keyword.text}>")
                     keyword_ids.append(r[0])
 
-                # create new topics if not exists, update count if exists
                 insert_topics = psycopg.sql.SQL("""
                     insert into public.topics (type, topic, count) values (%s, %s, 1)
                     on conflict (type, topic) do update set count = topics.count + 1
@@ -640,31 +480,54 @@ def print_sample_data(data):
         print(f"Topics: {', '.join(t.text for t in result.topics)}")
 
 
+NUM_DOCUMENTS = int(os.environ.get("NUM_DOCUMENTS", "120"))
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "20"))
+BENCHMARK = os.environ.get("BENCHMARK") == "1"
+
+
+async def save(wordstore: Wordstore, data: list[ProcessingResult], batch_size: int) -> float:
+    """Save data in batches, returns elapsed seconds"""
+    start = time.perf_counter()
+    for i in range(0, len(data), batch_size):
+        await wordstore.save_many(data[i : i + batch_size])
+        logger.info(f"Saved {min(i + batch_size, len(data))}/{len(data)} documents")
+    return time.perf_counter() - start
+
+
 async def main():
     conn_str = os.environ["POSTGRES_CONNECTION"]
     logger.info(f"Connecting to database using connection string: {conn_str}")
 
     # Initialize the database
-    wordstore = Wordstore(conn_str)
+    pool = create_pool(PostgresConfig(connection=conn_str))
+    await pool.open(wait=True)
+    wordstore = Wordstore(pool)
     logger.info("Initializing database schema...")
     await wordstore.init()
 
     # Generate data
     logger.info("Generating random data...")
-    num_documents = 120  # Generate 120 documents (more than the required 100)
-    data = generate_random_data(num_documents)
+    data = generate_random_data(NUM_DOCUMENTS)
 
     logger.info(f"Generated {len(data)} documents")
     print_sample_data(data)
 
     # Save to database
     logger.info("Saving data to database...")
-    for i, result in enumerate(data, 1):
-        await wordstore.save(result)
-        if i % 10 == 0:
-            logger.info(f"Saved {i}/{len(data)} documents")
-
-    logger.info(f"Successfully saved {len(data)} documents to the database")
+    elapsed = await save(wordstore, data, BATCH_SIZE)
+    logger.info(f"Successfully saved {len(data)} documents to the database in {elapsed:.2f}s")
+
+    if BENCHMARK:
+        paths = [
+            ("row by row", RowByRowWordstore(pool), 1),
+            ("save", wordstore, 1),
+            (f"save_many({BATCH_SIZE})", wordstore, BATCH_SIZE),
+        ]
+        for name, store, batch_size in paths:
+            elapsed = await save(store, generate_random_data(NUM_DOCUMENTS), batch_size)
+            logger.info(f"{name:>16}: {elapsed / NUM_DOCUMENTS * 1000:7.2f} ms/document")
+
+    await pool.close()
 
 
 if __name__ == "__main__":